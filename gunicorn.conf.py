@@ -0,0 +1,57 @@
+"""
+Gunicorn settings for the X Bot web interface
+Used automatically by: gunicorn x_bot_web_enhanced:app
+Every value can be tuned with an environment variable.
+"""
+
+import os
+import signal
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5003')}"
+
+# Worker processes x threads per worker. Posting and scheduling run on the
+# job queue, so request threads only wait on SQLite and file writes.
+# The scheduler and the auto-reply monitor run in one worker (file lock);
+# settings saved through any worker are picked up within a few seconds.
+# Live /events are relayed through the database, so every worker's streams
+# see the scheduler's events within a second.
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+worker_class = 'gthread'
+# Each open dashboard holds one thread for its /events stream; at most
+# WEB_EVENT_STREAMS (default 4) per worker, further ones get a 503 and retry
+threads = int(os.environ.get('WEB_THREADS', '8'))
+
+timeout = int(os.environ.get('WEB_TIMEOUT', '60'))
+keepalive = 5
+
+# Time given to in-flight jobs and scheduled posts on SIGTERM
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', '30'))
+
+# Each worker builds its own bot; its threads must not be created before fork
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_worker_init(worker):
+    """Initialize the bot (and possibly the scheduler) in the background at worker start"""
+    import x_bot_web_enhanced
+    x_bot_web_enhanced.bot_initializer.warm_up()
+
+    # /events streams never finish on their own; end them on SIGTERM so they
+    # don't hold the graceful shutdown open until graceful_timeout
+    handle_exit = worker.handle_exit
+
+    def end_streams_and_exit(sig, frame):
+        if x_bot_web_enhanced.bot is not None:
+            x_bot_web_enhanced.bot.events.close()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, end_streams_and_exit)
+
+
+def worker_exit(server, worker):
+    """Finish in-flight work and release the scheduler lock"""
+    import x_bot_web_enhanced
+    x_bot_web_enhanced.shutdown(timeout=max(graceful_timeout - 5, 1))
@@ -12,6 +12,9 @@ import argparse
 import json
 from pathlib import Path
 
+from x_bot_http import use_shared_transport
+from x_bot_media import upload_media_files
+
 
 class XBot:
     """X/Twitter Bot for posting tweets"""
@@ -67,8 +70,9 @@ class XBot:
                     consumer_secret=self.api_secret,
                     access_token=self.access_token,
                     access_token_secret=self.access_token_secret,
-                    wait_on_rate_limit=True
+                    wait_on_rate_limit=False
                 )
+                use_shared_transport(self.client)
                 
                 # Test authentication
                 if self.access_token and self.access_token_secret:
@@ -90,6 +94,7 @@ class XBot:
                     self.access_token_secret
                 )
                 self.api = tweepy.API(auth)
+                use_shared_transport(self.api)
                 
         except Exception as e:
             print(f"✗ Authentication failed: {e}")
@@ -160,15 +165,8 @@ class XBot:
         
         try:
             # Upload media using v1.1 API
-            media_ids = []
-            for media_path in media_paths[:4]:  # Max 4 images
-                if not os.path.exists(media_path):
-                    print(f"⚠ Warning: Media file not found: {media_path}")
-                    continue
-                
-                media = self.api.media_upload(media_path)
-                media_ids.append(media.media_id)
-                print(f"✓ Uploaded media: {media_path}")
+            # Uploads run concurrently; IDs keep the order of media_paths
+            media_ids = upload_media_files(self.api, media_paths[:4])  # Max 4 images
             
             if not media_ids:
                 print("✗ No media was uploaded successfully")
@@ -8,27 +8,23 @@ import webview
 import threading
 from flask import Flask, render_template_string, request, jsonify
 from x_bot_enhanced import XBotEnhanced
+from x_bot_startup import BotInitializer
 from datetime import datetime, timedelta
 import time
 
 app = Flask(__name__)
 
-# Initialize enhanced bot
-bot = None
-authenticated = False
+def create_bot():
+    """Build the enhanced bot (runs once per process)"""
+    bot = XBotEnhanced()
+    return bot, bool(bot.client)
+
+# Built once, in the background at startup
+bot_initializer = BotInitializer(create_bot)
 
 def lazy_init_bot():
-    """Initialize bot only when needed"""
-    global bot, authenticated
-    if bot is None:
-        try:
-            bot = XBotEnhanced()
-            if bot.client:
-                authenticated = True
-        except Exception as e:
-            print(f"Bot init note: {e}")
-            authenticated = False
-    return bot, authenticated
+    """Return (bot, authenticated); waits for the warm-up if it is still running"""
+    return bot_initializer.get()
 
 # Beautiful Enhanced HTML with all features
 HTML_TEMPLATE = '''
@@ -592,6 +588,9 @@ HTML_TEMPLATE = '''
                 if (data.success) {
                     log('✅ Scheduled tweet cancelled');
                     refreshScheduled();
+                } else {
+                    log('❌ Error: ' + data.error);
+                    alert('Error: ' + data.error);
                 }
             } catch (error) {
                 alert('Error: ' + error);
@@ -751,7 +750,8 @@ def cancel_scheduled():
     tweet_id = data.get('id')
     
     try:
-        bot.cancel_scheduled_tweet(tweet_id)
+        if not bot.cancel_scheduled_tweet(tweet_id):
+            return jsonify({'success': False, 'error': 'Tweet is already being posted or is no longer scheduled'})
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -770,7 +770,7 @@ def save_autoreply():
     try:
         # Configure auto-reply
         bot.auto_reply_config['enabled'] = enabled
-        bot.auto_reply_config['keywords'] = {kw: message for kw in keywords}
+        bot.set_keyword_replies(keywords, message)
         
         if enabled and not bot.auto_reply_running:
             bot.start_auto_reply()
@@ -788,6 +788,9 @@ def start_flask():
 if __name__ == '__main__':
     print("\n🚀 X Bot Enhanced - Loading features...\n")
     
+    # Authenticate while the window opens, then start the scheduler
+    bot_initializer.warm_up(on_ready=lambda bot: bot.start_scheduler())
+    
     # Start Flask server
     flask_thread = threading.Thread(target=start_flask, daemon=True)
     flask_thread.start()
@@ -806,16 +809,6 @@ if __name__ == '__main__':
         transparent=True
     )
     
-    # Start scheduler in background if bot is initialized
-    def start_scheduler_thread():
-        time.sleep(2)
-        bot, auth = lazy_init_bot()
-        if auth and bot:
-            bot.start_scheduler()
-    
-    scheduler_thread = threading.Thread(target=start_scheduler_thread, daemon=True)
-    scheduler_thread.start()
-    
     # Start the application
     webview.start()
 
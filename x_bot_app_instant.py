@@ -7,26 +7,23 @@ Beautiful dark glass GUI that works even during rate limits
 import webview
 import threading
 from flask import Flask, render_template_string, request, jsonify
+from x_bot_startup import BotInitializer
 import os
 
 app = Flask(__name__)
 
-# We'll initialize the bot ONLY when posting, not at startup
-bot = None
-authenticated = False
+def create_bot():
+    """Build the bot (runs once per process)"""
+    from x_bot import XBot
+    bot = XBot()
+    return bot, bool(bot.client)
+
+# Built in the background after the window opens, never blocking startup
+bot_initializer = BotInitializer(create_bot)
 
 def lazy_init_bot():
-    """Initialize bot only when needed"""
-    global bot, authenticated
-    if bot is None:
-        try:
-            from x_bot import XBot
-            bot = XBot()
-            if bot.client:
-                authenticated = True
-        except:
-            authenticated = False
-    return bot, authenticated
+    """Return (bot, authenticated); waits for the warm-up if it is still running"""
+    return bot_initializer.get()
 
 # Beautiful dark glass HTML
 HTML_TEMPLATE = '''
@@ -482,6 +479,9 @@ if __name__ == '__main__':
     flask_thread = threading.Thread(target=start_flask, daemon=True)
     flask_thread.start()
     
+    # Authenticate in the background so the first post doesn't wait for it
+    bot_initializer.warm_up()
+    
     # Give Flask time to start
     import time
     time.sleep(1)
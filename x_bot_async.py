@@ -0,0 +1,360 @@
+"""
+X Bot Async - asyncio front end for XBotEnhanced
+Posting, mention polling, auto-replies and the scheduler run as coroutines on
+one event loop over a shared aiohttp connector, so hundreds of in-flight
+requests cost a socket each instead of a thread each.
+
+Requires tweepy's async extra: pip install "tweepy[async]"
+"""
+
+import asyncio
+from typing import List, Optional, Tuple
+
+import tweepy
+
+try:
+    import aiohttp
+    from tweepy.asynchronous import AsyncClient
+    ASYNC_AVAILABLE = True
+except (ImportError, tweepy.TweepyException):
+    # tweepy.asynchronous raises TweepyException when aiohttp is missing
+    ASYNC_AVAILABLE = False
+
+from x_bot_enhanced import CREATE_TWEET_ENDPOINT, XBotEnhanced
+
+# Simultaneous HTTP connections on the shared connector
+MAX_CONNECTIONS = 200
+
+
+class AsyncXBot:
+    """
+    Async counterpart of XBotEnhanced
+
+    State (database, scheduled tweets, rules, rate limits, media cache) lives
+    in a wrapped XBotEnhanced, so the sync bot, the GUIs and the web apps keep
+    working unchanged against the same data. Every scheduling, posting-limit
+    and reply decision is made by the bot's public helpers, so both front ends
+    behave the same; this class only performs the I/O. API calls go through
+    tweepy.asynchronous.AsyncClient; v1.1 media uploads and SQLite writes,
+    which have no async API, run in worker threads via asyncio.to_thread.
+    """
+
+    def __init__(self, bot: XBotEnhanced = None, max_connections: int = MAX_CONNECTIONS, **kwargs):
+        """
+        Args:
+            bot: Existing XBotEnhanced to share state with (created from kwargs if omitted)
+            max_connections: Upper bound on concurrent HTTP connections
+            kwargs: Passed to XBotEnhanced when bot is not given
+        """
+        if not ASYNC_AVAILABLE:
+            raise ImportError('AsyncXBot requires aiohttp: pip install "tweepy[async]"')
+
+        self.bot = bot or XBotEnhanced(**kwargs)
+        self.max_connections = max_connections
+        self.client = None
+        self.scheduler_running = False
+        self.auto_reply_running = False
+        self._stop = None
+
+        if self.bot.client:
+            self.client = AsyncClient(
+                bearer_token=self.bot.bearer_token,
+                consumer_key=self.bot.api_key,
+                consumer_secret=self.bot.api_secret,
+                access_token=self.bot.access_token,
+                access_token_secret=self.bot.access_token_secret
+            )
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        """Create the pooled aiohttp session (called automatically on first use)"""
+        if self.client is None or (self.client.session and not self.client.session.closed):
+            return
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(self._record_rate_limit)
+        self.client.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                ttl_dns_cache=300
+            ),
+            trace_configs=[trace]
+        )
+
+    async def close(self):
+        """Stop the loops and close the HTTP session"""
+        self.stop()
+        if self.client is not None and self.client.session is not None:
+            await self.client.session.close()
+            self.client.session = None
+
+    async def _record_rate_limit(self, session, context, params):
+        """aiohttp trace hook: feed rate-limit headers to the bot's registry"""
+        self.bot.rate_limits.record(
+            params.method, str(params.url), params.response.headers,
+            params.headers.get('Authorization', '')
+        )
+
+    # ===== POSTING =====
+
+    async def post_tweet(self, content: str, reply_to_tweet_id: str = None):
+        """Post a simple text tweet; returns the tweet ID or None"""
+        return (await self._post(content, reply_to_tweet_id))[0]
+
+    async def post_tweet_with_media(self, content: str, media_files: List,
+                                    reply_to_tweet_id: str = None, media_ids: List[int] = None):
+        """
+        Post a tweet with media; returns the tweet ID or None
+
+        Args:
+            content: Tweet content
+            media_files: Image file paths, or (filename, file-like) pairs
+            reply_to_tweet_id: ID of tweet to reply to
+            media_ids: Media IDs already uploaded for media_files
+        """
+        if not self.client or not self.bot.api:
+            print("❌ Not authenticated. Check your credentials.")
+            return None
+
+        if not media_files:
+            return await self.post_tweet(content, reply_to_tweet_id)
+
+        return (await self._post(content, reply_to_tweet_id, media_files, media_ids))[0]
+
+    async def _post(self, content: str, reply_to_tweet_id: str = None,
+                    media_files: List = None, media_ids: List[int] = None) -> Tuple[Optional[str], bool]:
+        """
+        Post a tweet, with media when media_files is given
+
+        Returns:
+            (tweet ID or None, True if a posting limit refused the tweet)
+        """
+        if not self.client or (media_files and not self.bot.api):
+            print("❌ Not authenticated. Check your credentials.")
+            return None, False
+
+        if not await asyncio.to_thread(self.bot.acquire_post_slot):
+            return None, True
+
+        await self.open()
+        kind = 'tweet with media' if media_files else 'tweet'
+        try:
+            if media_files:
+                # v1.1 media upload has no async client; run it off the event loop
+                media_ids, reused_ids = await asyncio.to_thread(
+                    self.bot.upload_tweet_media, media_files, media_ids
+                )
+
+                if not media_ids:
+                    print("❌ No valid media files found")
+                    return None, False
+
+            try:
+                response = await self.client.create_tweet(
+                    text=content,
+                    media_ids=media_ids if media_files else None,
+                    in_reply_to_tweet_id=reply_to_tweet_id
+                )
+            except tweepy.BadRequest:
+                if not media_files or not reused_ids:
+                    raise
+                media_ids = await asyncio.to_thread(
+                    self.bot.reupload_tweet_media, media_files, reused_ids
+                )
+                response = await self.client.create_tweet(
+                    text=content,
+                    media_ids=media_ids,
+                    in_reply_to_tweet_id=reply_to_tweet_id
+                )
+
+            if response.data:
+                tweet_id = response.data['id']
+                print(f"✓ {kind.capitalize()} posted: {tweet_id}")
+                return str(tweet_id), False
+            print("❌ No response data from API")
+        except tweepy.TooManyRequests:
+            print("❌ Rate limit exceeded. Please wait before posting again.")
+            return None, True
+        except Exception as e:
+            print(f"❌ Failed to post {kind}: {e}")
+        return None, False
+
+    # ===== MENTIONS AND AUTO-REPLY =====
+
+    async def get_mentions(self, since_id: str = None, page_size: int = 100):
+        """
+        Fetch every mention newer than since_id, following pagination_token
+
+        Returns:
+            (mentions oldest-first, newest mention ID or None, requests made)
+        """
+        await self.open()
+        fetch = await asyncio.to_thread(self.bot.begin_mention_fetch, since_id, page_size)
+        while not fetch.done:
+            try:
+                response = await self.client.get_users_mentions(fetch.user_id, **fetch.next_request())
+            finally:
+                self.bot.update_mention_budget()
+            fetch.add_page(response)
+        mentions, newest_id = fetch.result()
+        return mentions, newest_id, fetch.requests
+
+    async def _send_auto_reply(self, original_tweet_id: str, response: str, author_id: str):
+        """Send one auto-reply within X's limit and the reply, cooldown and posting limits"""
+        # Replies go through POST /2/tweets, so check X's limit for that endpoint
+        if not await asyncio.to_thread(
+            self.bot.reserve_auto_reply, original_tweet_id, author_id, CREATE_TWEET_ENDPOINT
+        ):
+            return False
+
+        try:
+            reply = await self.client.create_tweet(
+                text=response,
+                in_reply_to_tweet_id=original_tweet_id
+            )
+            await asyncio.to_thread(self.bot.record_auto_reply, original_tweet_id, reply.data['id'])
+            return True
+        except Exception as e:
+            print(f"❌ Failed to send auto-reply: {e}")
+            return False
+
+    async def process_mentions(self, mentions):
+        """Match mentions against the rules and send the replies concurrently"""
+        targets = await asyncio.to_thread(self.bot.auto_reply_targets, mentions)
+        return await asyncio.gather(*(
+            self._send_auto_reply(mention.id, response, mention.author_id)
+            for mention, response in targets
+        ))
+
+    async def _sleep(self, seconds: float):
+        """Sleep, returning early when stop() is called"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run_auto_reply(self):
+        """Auto-reply loop: poll mentions at the poller's adaptive interval"""
+        if not self.client:
+            print("❌ Bearer token required for auto-reply functionality")
+            return
+
+        self._stop = self._stop or asyncio.Event()
+        self.auto_reply_running = True
+        last_mention_id = await asyncio.to_thread(self.bot.get_state, 'mentions_since_id')
+        print("✓ Async auto-reply monitor started")
+
+        while self.auto_reply_running and not self._stop.is_set():
+            interval = self.bot.mention_poller.next_interval()
+            try:
+                await asyncio.to_thread(self.bot.check_rate_limits)
+                mentions, newest_id, requests = await self.get_mentions(last_mention_id)
+
+                if mentions:
+                    await self.process_mentions(mentions)
+
+                # Advance the cursor only after the batch was handled
+                interval = await asyncio.to_thread(
+                    self.bot.complete_mention_poll, len(mentions), newest_id, requests
+                )
+                last_mention_id = newest_id or last_mention_id
+            except Exception as e:
+                print(f"❌ Auto-reply error: {e}")
+            await self._sleep(interval)
+
+    # ===== SCHEDULER =====
+
+    async def post_scheduled_tweet(self, tweet_id: int):
+        """Claim, post and finish one scheduled tweet"""
+        post = await asyncio.to_thread(self.bot.claim_scheduled_post, tweet_id)
+        if not post:
+            return False
+
+        try:
+            tweet_result, limited = await self._post(
+                post['content'], post['reply_to_tweet_id'], post['media_files'], post['media_ids']
+            )
+        except Exception as e:
+            return await asyncio.to_thread(self.bot.finish_scheduled_post, tweet_id, None, e)
+        return await asyncio.to_thread(
+            self.bot.finish_scheduled_post, tweet_id, tweet_result, None, limited
+        )
+
+    async def _post_due_tweets(self, batch_size: int = 100):
+        """Post every due tweet concurrently, within the posting budget"""
+        seen = set()
+        while self.scheduler_running:
+            batch = await asyncio.to_thread(self.bot.next_due_batch, seen, batch_size)
+            if not batch:
+                return
+            await asyncio.gather(*(self.post_scheduled_tweet(tweet_id) for tweet_id in batch))
+
+    async def run_scheduler(self):
+        """
+        Scheduler loop on the event loop
+
+        Uses the wrapped bot's due queue, so tweets scheduled through the sync
+        API wake it immediately. Do not also run the bot's threaded scheduler.
+        """
+        bot = self.bot
+        self._stop = self._stop or asyncio.Event()
+        self.scheduler_running = True
+        await asyncio.to_thread(bot.prepare_scheduler)
+        print("✓ Async tweet scheduler started")
+
+        background = set()
+        while self.scheduler_running and not self._stop.is_set():
+            try:
+                # The blocking wait runs in one worker thread; stop() wakes it
+                due_keys = await asyncio.to_thread(bot.due_queue.wait, bot.scheduler_poll_seconds)
+                if not due_keys:
+                    await asyncio.to_thread(bot.sync_due_queue)
+                    continue
+
+                posts_due, jobs = bot.split_due_keys(due_keys)
+                for job in jobs:
+                    task = asyncio.ensure_future(asyncio.to_thread(job))
+                    background.add(task)
+                    task.add_done_callback(background.discard)
+
+                if posts_due:
+                    await self._post_due_tweets()
+            except Exception as e:
+                print(f"❌ Scheduler error: {e}")
+                await self._sleep(5)
+
+        if background:
+            await asyncio.gather(*background, return_exceptions=True)
+
+    async def run(self):
+        """Run the scheduler and the auto-reply monitor until stop() is called"""
+        self._stop = asyncio.Event()
+        async with self:
+            await asyncio.gather(self.run_scheduler(), self.run_auto_reply())
+
+    def stop(self):
+        """Stop both loops"""
+        self.scheduler_running = False
+        self.auto_reply_running = False
+        if self._stop is not None:
+            self._stop.set()
+        self.bot.due_queue.wake()
+
+
+def main():
+    """Run the scheduler and auto-reply monitor on one event loop"""
+    bot = AsyncXBot()
+    try:
+        asyncio.run(bot.run())
+    except KeyboardInterrupt:
+        print("\n✓ Stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+X Bot Blobs - Content-addressed store for scheduled tweet media
+Files are saved once per distinct content as <sha256><ext>, referenced from
+scheduled_tweets.media_files (and the media_files of unfinished jobs), and
+deleted by collect_garbage() once nothing live refers to them
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+from x_bot_media import media_name, open_media
+
+# Queries returning the JSON media_files lists that must be kept on disk
+LIVE_REFERENCES = (
+    '''
+    SELECT media_files FROM scheduled_tweets
+    WHERE media_files IS NOT NULL AND status IN ('pending', 'posting')
+    ''',
+    '''
+    SELECT json_extract(payload, '$.media_files') FROM jobs
+    WHERE status IN ('queued', 'running')
+        AND json_extract(payload, '$.media_files') IS NOT NULL
+    ''',
+)
+
+
+class BlobStore:
+    """
+    Deduplicated media files for scheduled tweets
+
+    Identical uploads map to the same file, so storing the same image twice
+    costs nothing and two uploads can never overwrite each other. Reference
+    counts are derived from the media_files of live scheduled tweets and
+    unfinished jobs, so posting or cancelling a tweet releases its blobs
+    without any bookkeeping of its own.
+    """
+
+    def __init__(self, root: str, db, grace_seconds: float = 60 * 60):
+        """
+        Args:
+            root: Directory holding the blobs; garbage collection never looks outside it
+            db: ConnectionPool with the scheduled_tweets table
+            grace_seconds: Minimum age before an unreferenced blob is deleted,
+                covering the gap between storing a file and scheduling the tweet
+        """
+        self.root = os.path.realpath(root)
+        self.db = db
+        self.grace_seconds = grace_seconds
+        os.makedirs(self.root, exist_ok=True)
+
+    def put(self, media) -> str:
+        """
+        Store a media item and return the blob path to schedule with
+
+        The content is hashed while it is copied into the store, so each item
+        is read exactly once.
+
+        Args:
+            media: File path, (filename, file-like or bytes) pair, or named file-like object
+        """
+        if isinstance(media, str) and os.path.dirname(os.path.realpath(media)) == self.root:
+            # Already a blob; just protect it from a concurrent collection
+            os.utime(media)
+            return os.path.realpath(media)
+
+        extension = os.path.splitext(media_name(media))[1].lower()
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out, open_media(media) as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+                    out.write(block)
+
+            path = os.path.join(self.root, digest.hexdigest() + extension)
+            if os.path.exists(path):
+                os.remove(temp_path)
+                # Refresh the mtime so a concurrent collection keeps the blob
+                os.utime(path)
+            else:
+                os.replace(temp_path, path)
+            return path
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def refcounts(self) -> Counter:
+        """Number of live scheduled tweets and jobs referencing each blob path"""
+        counts = Counter()
+        for query in LIVE_REFERENCES:
+            for (media_json,) in self.db.fetchall(query):
+                for path in json.loads(media_json):
+                    counts[os.path.realpath(path)] += 1
+        return counts
+
+    def collect_garbage(self) -> int:
+        """
+        Delete blobs no live scheduled tweet refers to
+
+        Only regular files directly inside root are considered; files younger
+        than grace_seconds are kept.
+
+        Returns:
+            Number of files deleted
+        """
+        referenced = self.refcounts()
+        cutoff = time.time() - self.grace_seconds
+        removed = 0
+        freed = 0
+
+        for entry in os.scandir(self.root):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            path = os.path.join(self.root, entry.name)
+            if referenced[path]:
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > cutoff:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += stat.st_size
+
+        if removed:
+            print(f"✓ Removed {removed} unused media file(s) ({freed // 1024} KB)")
+        return removed
@@ -0,0 +1,38 @@
+"""
+X Bot Cache - Small in-memory caches shared by the bot components
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUSet:
+    """Thread-safe set that forgets its least recently added members beyond maxsize"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def add(self, key):
+        """
+        Add a key, marking it most recent
+
+        Returns:
+            The evicted key, or None if nothing was evicted
+        """
+        with self._lock:
+            self._items[key] = None
+            self._items.move_to_end(key)
+            if len(self._items) > self.maxsize:
+                evicted, _ = self._items.popitem(last=False)
+                return evicted
+        return None
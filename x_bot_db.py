@@ -0,0 +1,169 @@
+"""
+X Bot Database - Pooled SQLite connection layer
+Long-lived, thread-bound connections shared by the scheduler, the auto-reply
+monitor and web request threads
+"""
+
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+
+def _split_statements(script: str):
+    """Split a SQL script into statements, keeping trigger bodies intact"""
+    buffer = ''
+    for part in script.split(';'):
+        buffer += part + ';'
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip(' \t\n;'):
+                yield buffer.strip()
+            buffer = ''
+
+
+class _Lease:
+    """Holds a thread's connection; collected when the owning thread exits"""
+    __slots__ = ('conn', '__weakref__')
+
+
+class ConnectionPool:
+    """
+    Thread-aware pool of SQLite connections
+
+    Each thread gets one connection on first use and keeps it for its whole
+    lifetime. When the thread exits the connection goes back to the idle pool,
+    so short-lived request threads reuse warm connections instead of opening
+    the database file again. Connections run in WAL mode with
+    synchronous=NORMAL, and sqlite3's per-connection statement cache keeps
+    prepared statements alive across calls.
+    """
+
+    def __init__(self, db_file: str, timeout: float = 30.0,
+                 cached_statements: int = 256, max_idle: int = 8):
+        """
+        Args:
+            db_file: Path to the SQLite database
+            timeout: Seconds to wait on a locked database before failing
+            cached_statements: Prepared statements kept per connection
+            max_idle: Idle connections kept for reuse by new threads
+        """
+        self.db_file = db_file
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.max_idle = max_idle
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle = []
+        self._all = []
+        self._closed = False
+
+    def _connect(self):
+        """Open a new connection with the pool's PRAGMAs applied"""
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            isolation_level=None
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.timeout * 1000)}')
+        return conn
+
+    def _acquire(self):
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            conn = self._connect()
+            self._all.append(conn)
+            return conn
+
+    def _release(self, conn):
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            if conn in self._all:
+                self._all.remove(conn)
+        conn.close()
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, checking one out if needed"""
+        lease = getattr(self._local, 'lease', None)
+        if lease is None:
+            lease = _Lease()
+            lease.conn = self._acquire()
+            weakref.finalize(lease, self._release, lease.conn)
+            self._local.lease = lease
+        return lease.conn
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Run a single statement in autocommit mode"""
+        return self.connection().execute(sql, params)
+
+    def fetchone(self, sql: str, params=()):
+        """Run a query and return the first row"""
+        return self.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params=()):
+        """Run a query and return all rows"""
+        return self.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block of statements atomically
+
+        Uses BEGIN IMMEDIATE so the write lock is taken up front; under WAL a
+        deferred transaction that later upgrades to a writer can fail with
+        'database is locked' without waiting on busy_timeout.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            # Nested use joins the outer transaction
+            yield conn
+            return
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def migrate(self, migrations) -> int:
+        """
+        Apply pending schema migrations
+
+        Args:
+            migrations: Ordered list of SQL scripts; the list index + 1 is the
+                schema version each one produces (tracked in PRAGMA user_version)
+
+        Returns:
+            The schema version after migrating
+        """
+        with self.transaction() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for target, script in enumerate(migrations[version:], start=version + 1):
+                for statement in _split_statements(script):
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version={target}')
+                version = target
+        return version
+
+    def close(self):
+        """Close every connection owned by the pool"""
+        with self._lock:
+            self._closed = True
+            connections, self._all, self._idle = self._all, [], []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
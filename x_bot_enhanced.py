@@ -5,19 +5,197 @@ Features: Tweet scheduling, automated replies, keyword monitoring
 """
 
 import tweepy
+import base64
 import os
 import sys
 import json
-import sqlite3
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 import argparse
 import schedule
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import re
 
+from x_bot_blobs import BlobStore
+from x_bot_cache import LRUSet
+from x_bot_db import ConnectionPool
+from x_bot_events import EventBus
+from x_bot_http import use_shared_transport
+from x_bot_limiter import RateLimiter, RateLimitRegistry
+from x_bot_media import MediaCache, upload_media_files
+from x_bot_polling import AdaptivePoller
+from x_bot_rules import RuleStore
+from x_bot_scheduler import DueQueue
+
+
+# Schema migrations applied on top of the base tables, in order.
+# Append new entries; never edit or reorder existing ones.
+MIGRATIONS = [
+    # 1: due-window lookups for the scheduler
+    '''
+    CREATE INDEX IF NOT EXISTS idx_scheduled_tweets_status_time
+        ON scheduled_tweets (status, scheduled_time)
+    ''',
+    # 2: claim timestamp for the 'posting' state used by the dispatcher
+    '''
+    ALTER TABLE scheduled_tweets ADD COLUMN claimed_at DATETIME
+    ''',
+    # 3: rule priority and whole-word matching for the keyword matcher
+    '''
+    ALTER TABLE auto_reply_rules ADD COLUMN priority INTEGER DEFAULT 0;
+    ALTER TABLE auto_reply_rules ADD COLUMN whole_word BOOLEAN DEFAULT 0
+    ''',
+    # 4: who owns a rule, so UI keyword lists can be replaced as a set
+    '''
+    ALTER TABLE auto_reply_rules ADD COLUMN source TEXT DEFAULT 'manual'
+    ''',
+    # 5: dedup lookups for mentions
+    '''
+    CREATE INDEX IF NOT EXISTS idx_reply_history_original
+        ON reply_history (original_tweet_id)
+    ''',
+    # 6: small key/value store for state that must survive restarts
+    '''
+    CREATE TABLE IF NOT EXISTS bot_state (
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # 7: token-bucket state for RateLimiter, so limits survive restarts
+    '''
+    CREATE TABLE IF NOT EXISTS rate_limit_state (
+        name TEXT NOT NULL,
+        key TEXT NOT NULL,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (name, key)
+    )
+    ''',
+    # 8: media IDs of uploaded files, keyed by content hash
+    '''
+    CREATE TABLE IF NOT EXISTS media_cache (
+        digest TEXT PRIMARY KEY,
+        media_id TEXT NOT NULL,
+        uploaded_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    ''',
+    # 9: media uploaded ahead of a scheduled tweet's post time
+    '''
+    ALTER TABLE scheduled_tweets ADD COLUMN media_ids TEXT;
+    ALTER TABLE scheduled_tweets ADD COLUMN media_expires_at REAL
+    ''',
+    # 10: background jobs queued by the web app (see x_bot_jobs.JobQueue)
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        result TEXT,
+        error TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        started_at DATETIME,
+        finished_at DATETIME
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)
+    ''',
+    # 11: bot_state['scheduled_tweets_version'], bumped on every change to the
+    # scheduled list the UI can see (ETags for /get-scheduled)
+    '''
+    CREATE TRIGGER IF NOT EXISTS scheduled_tweets_version_insert
+    AFTER INSERT ON scheduled_tweets
+    BEGIN
+        INSERT INTO bot_state (key, value) VALUES ('scheduled_tweets_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1,
+            updated_at = CURRENT_TIMESTAMP;
+    END;
+    CREATE TRIGGER IF NOT EXISTS scheduled_tweets_version_update
+    AFTER UPDATE OF content, scheduled_time, media_files, reply_to_tweet_id, status
+    ON scheduled_tweets
+    BEGIN
+        INSERT INTO bot_state (key, value) VALUES ('scheduled_tweets_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1,
+            updated_at = CURRENT_TIMESTAMP;
+    END;
+    CREATE TRIGGER IF NOT EXISTS scheduled_tweets_version_delete
+    AFTER DELETE ON scheduled_tweets
+    BEGIN
+        INSERT INTO bot_state (key, value) VALUES ('scheduled_tweets_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1,
+            updated_at = CURRENT_TIMESTAMP;
+    END
+    ''',
+    # 12: live status events shared by every process (see x_bot_events.EventBus)
+    '''
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+]
+
+# Statuses a scheduled tweet can have
+SCHEDULED_STATUSES = ('pending', 'posting', 'posted', 'failed', 'cancelled')
+
+
+# Endpoints whose X rate limits the scheduler and reply engine plan around
+CREATE_TWEET_ENDPOINT = 'POST /2/tweets'
+MENTIONS_ENDPOINT = 'GET /2/users/:id/mentions'
+REPLY_ENDPOINT = 'POST /1.1/statuses/update.json'
+
+
+class MentionFetch:
+    """
+    Pagination state for one fetch of new mentions
+    
+    Shared by XBotEnhanced and AsyncXBot: each asks for next_request(), sends
+    it with its own client and hands the response to add_page() until done.
+    Without a since_id (first run) only the most recent page is fetched, so a
+    fresh install doesn't answer the account's whole mention history.
+    """
+    
+    def __init__(self, user_id: str, since_id: str = None, page_size: int = 100):
+        self.user_id = user_id
+        self.since_id = since_id
+        self.page_size = page_size
+        self.requests = 0
+        self.mentions = []
+        self.newest_id = None
+        self.done = False
+        self._pagination_token = None
+    
+    def next_request(self) -> dict:
+        """Keyword arguments for the next get_users_mentions(user_id, ...) call"""
+        self.requests += 1
+        return {
+            'since_id': self.since_id,
+            'max_results': self.page_size,
+            'pagination_token': self._pagination_token,
+            'tweet_fields': ['author_id']
+        }
+    
+    def add_page(self, response):
+        """Collect one page of results"""
+        meta = response.meta or {}
+        if self.newest_id is None:
+            self.newest_id = meta.get('newest_id')
+        if response.data:
+            self.mentions.extend(response.data)
+        self._pagination_token = meta.get('next_token')
+        self.done = not self._pagination_token or self.since_id is None
+    
+    def result(self):
+        """(mentions oldest-first, newest mention ID or None)"""
+        # Pages come newest-first; reply in the order mentions arrived
+        return list(reversed(self.mentions)), self.newest_id
+
 
 class XBotEnhanced:
     """Enhanced X/Twitter Bot with scheduling and auto-reply capabilities"""
@@ -32,11 +210,50 @@ class XBotEnhanced:
         """
         self.client = None
         self.api = None
+        self.user_id = None
         self.credentials_file = credentials_file or "x_credentials.json"
         self.db_file = db_file
+        self.db = ConnectionPool(db_file)
+        self.rule_store = RuleStore(self.db)
+        self.media_cache = MediaCache(self.db)
+        # X's own limits, learned from response headers (see _authenticate)
+        self.rate_limits = RateLimitRegistry()
+        # Deduplicated media files of scheduled tweets
+        self.blob_store = BlobStore(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scheduled_images'), self.db
+        )
+        # Live status updates for the web UI, shared through the database
+        self.events = EventBus(self.db)
         self.scheduler_running = False
+        self._scheduler_thread = None
         self.auto_reply_running = False
         
+        # In-memory queue of pending tweet deadlines (see _scheduler_loop)
+        self.due_queue = DueQueue()
+        self._last_synced_id = 0
+        self._synced_version = None
+        # How often an idle scheduler checks for tweets scheduled by other
+        # processes (one bot_state read when nothing changed)
+        self.scheduler_poll_seconds = 5
+        
+        # Parallel dispatch of due tweets, capped by the posting budget below
+        self.dispatch_workers = 4
+        self.stale_claim_minutes = 10
+        
+        # Upload a scheduled tweet's media this long before it is due, on
+        # its own pool so slow uploads never hold up due posts
+        self.media_lookahead_minutes = 30
+        self.background_workers = 2
+        
+        # How often unreferenced scheduled media is deleted
+        self.blob_gc_seconds = 10 * 60
+        
+        # POST /2/tweets budget - adjust to your API tier
+        self.posts_per_window = 100
+        self.post_window_seconds = 15 * 60
+        # Retry delay for a post refused by X without a reported reset time
+        self.post_limit_retry_seconds = 60
+        
         # Load credentials and initialize database
         self._load_credentials()
         self._init_database()
@@ -49,9 +266,22 @@ class XBotEnhanced:
             'max_replies_per_hour': 10
         }
         
+        # Recently replied tweet IDs. The cache is complete for every ID above
+        # _replied_floor, so newer mentions are deduplicated without the DB.
+        self._replied_cache = LRUSet(maxsize=5000)
+        self._replied_floor = None
+        self._replied_lock = threading.Lock()
+        
+        # Mention polling adapts to traffic and the endpoint's read budget
+        self.mention_poller = AdaptivePoller()
+        self._last_mention_requests = 0
+        self._auto_reply_stop = threading.Event()
+        
         # Rate limiting tracking
         self.reply_count = 0
         self.last_reply_reset = datetime.now()
+        self.limiter = RateLimiter(self.db)
+        self._configure_rate_limits()
     
     def _load_credentials(self):
         """Load credentials from file or environment variables"""
@@ -90,7 +320,10 @@ class XBotEnhanced:
                 self.api_key, self.api_secret,
                 self.access_token, self.access_token_secret
             )
-            self.api = tweepy.API(auth, wait_on_rate_limit=True)
+            # Never sleep inside tweepy; callers plan around self.rate_limits
+            self.api = tweepy.API(auth, wait_on_rate_limit=False)
+            use_shared_transport(self.api)
+            self.api.session.hooks['response'].append(self.rate_limits.hook)
             
             # OAuth 2.0 Bearer Token (for reading)
             if self.bearer_token:
@@ -100,8 +333,10 @@ class XBotEnhanced:
                     consumer_secret=self.api_secret,
                     access_token=self.access_token,
                     access_token_secret=self.access_token_secret,
-                    wait_on_rate_limit=True
+                    wait_on_rate_limit=False
                 )
+                use_shared_transport(self.client)
+                self.client.session.hooks['response'].append(self.rate_limits.hook)
             
             # Verify credentials
             user = self.api.verify_credentials()
@@ -114,11 +349,15 @@ class XBotEnhanced:
     
     def _init_database(self):
         """Initialize SQLite database for scheduled tweets"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
+        with self.db.transaction() as conn:
+            self._create_tables(conn)
+        version = self.db.migrate(MIGRATIONS)
+        print(f"✓ Database initialized: {self.db_file} (schema v{version})")
+    
+    def _create_tables(self, conn):
+        """Create the base tables if they don't exist yet"""
         # Create scheduled tweets table
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS scheduled_tweets (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 content TEXT NOT NULL,
@@ -132,7 +371,7 @@ class XBotEnhanced:
         ''')
         
         # Create auto-reply rules table
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS auto_reply_rules (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 keyword TEXT NOT NULL,
@@ -143,7 +382,7 @@ class XBotEnhanced:
         ''')
         
         # Create reply history table (for rate limiting)
-        cursor.execute('''
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS reply_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 original_tweet_id TEXT NOT NULL,
@@ -151,10 +390,18 @@ class XBotEnhanced:
                 replied_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        
-        conn.commit()
-        conn.close()
-        print(f"✓ Database initialized: {self.db_file}")
+    
+    def get_state(self, key: str, default=None):
+        """Read a persisted bot_state value"""
+        row = self.db.fetchone('SELECT value FROM bot_state WHERE key = ?', (key,))
+        return row[0] if row else default
+    
+    def set_state(self, key: str, value):
+        """Persist a bot_state value"""
+        self.db.execute('''
+            INSERT INTO bot_state (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP
+        ''', (key, None if value is None else str(value)))
     
     # ===== SCHEDULING METHODS =====
     
@@ -166,102 +413,268 @@ class XBotEnhanced:
         Args:
             content: Tweet content
             scheduled_time: When to post the tweet
-            media_files: List of image file paths
+            media_files: List of image file paths (see store_media)
             reply_to_tweet_id: ID of tweet to reply to
         """
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
         media_json = json.dumps(media_files) if media_files else None
         
-        cursor.execute('''
+        # Store a sortable ISO string so due-window queries can compare in SQL
+        if isinstance(scheduled_time, datetime):
+            scheduled_time = scheduled_time.isoformat(sep=' ')
+        
+        cursor = self.db.execute('''
             INSERT INTO scheduled_tweets 
             (content, scheduled_time, media_files, reply_to_tweet_id)
             VALUES (?, ?, ?, ?)
         ''', (content, scheduled_time, media_json, reply_to_tweet_id))
         
-        conn.commit()
-        conn.close()
+        # Wake the scheduler so it re-computes its next deadline
+        for key, due in self._queue_entries(cursor.lastrowid, scheduled_time, bool(media_files)):
+            self.due_queue.push(key, due)
         
+        self.events.publish('scheduled', {
+            'id': cursor.lastrowid,
+            'text': content,
+            'scheduled_time': scheduled_time,
+            'media_count': len(media_files or [])
+        })
         print(f"✓ Tweet scheduled for {scheduled_time}")
         return cursor.lastrowid
     
+    def store_media(self, media_items: List) -> List[str]:
+        """
+        Save media for a scheduled tweet in the deduplicated blob store
+        
+        Args:
+            media_items: File paths or (filename, file-like) pairs
+        
+        Returns:
+            Blob paths to pass to schedule_tweet as media_files
+        """
+        return [self.blob_store.put(media) for media in media_items]
+    
+    def collect_media_garbage(self):
+        """Delete stored media that no pending scheduled tweet refers to"""
+        try:
+            return self.blob_store.collect_garbage()
+        except Exception as e:
+            print(f"⚠ Media cleanup failed: {e}")
+            return 0
+    
     def get_scheduled_tweets(self, status='pending'):
         """Get scheduled tweets from database"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        return self.db.fetchall('''
             SELECT id, content, scheduled_time, media_files, reply_to_tweet_id
             FROM scheduled_tweets 
             WHERE status = ? 
             ORDER BY scheduled_time ASC
         ''', (status,))
+    
+    def get_scheduled_page(self, status: str = 'pending', since: datetime = None,
+                           until: datetime = None, cursor: str = None, limit: int = 50):
+        """
+        One page of scheduled tweets in posting order
+        
+        Pages are keyed on (scheduled_time, id) rather than an offset, so each
+        page is one range scan of idx_scheduled_tweets_status_time (whose
+        entries end with the rowid, i.e. id) however deep it is.
+        
+        Args:
+            status: Only tweets with this status
+            since: Only tweets scheduled at or after this time
+            until: Only tweets scheduled before this time
+            cursor: next_cursor of the previous page, or None for the first page
+            limit: Maximum tweets per page
+        
+        Returns:
+            (rows, next_cursor) - rows as in get_scheduled_tweets(); next_cursor
+            is None on the last page
         
-        tweets = cursor.fetchall()
-        conn.close()
-        return tweets
+        Raises:
+            ValueError: Unknown status or malformed cursor
+        """
+        if status not in SCHEDULED_STATUSES:
+            raise ValueError(f"Unknown status: {status}")
+        
+        conditions, params = ['status = ?'], [status]
+        if since is not None:
+            conditions.append('scheduled_time >= ?')
+            params.append(since.isoformat(sep=' '))
+        if until is not None:
+            conditions.append('scheduled_time < ?')
+            params.append(until.isoformat(sep=' '))
+        if cursor:
+            try:
+                after_time, after_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            except (ValueError, TypeError):
+                raise ValueError("Invalid cursor")
+            conditions.append('(scheduled_time > ? OR (scheduled_time = ? AND id > ?))')
+            params.extend([after_time, after_time, int(after_id)])
+        
+        # One extra row tells whether there is a next page
+        rows = self.db.fetchall(f'''
+            SELECT id, content, scheduled_time, media_files, reply_to_tweet_id
+            FROM scheduled_tweets
+            WHERE {' AND '.join(conditions)}
+            ORDER BY scheduled_time ASC, id ASC
+            LIMIT ?
+        ''', params + [limit + 1])
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_id, _, last_time = rows[-1][:3]
+            next_cursor = base64.urlsafe_b64encode(json.dumps([last_time, last_id]).encode()).decode()
+        return rows, next_cursor
     
-    def post_scheduled_tweet(self, tweet_id: int):
-        """Post a scheduled tweet and update its status"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+    def scheduled_tweets_version(self) -> int:
+        """Counter bumped by a trigger whenever the scheduled list changes"""
+        return int(self.get_state('scheduled_tweets_version', 0) or 0)
+    
+    def get_due_tweets(self, now: datetime = None, limit: int = 100):
+        """
+        Get pending tweets whose scheduled time has passed
         
-        # Get tweet details
-        cursor.execute('''
-            SELECT content, media_files, reply_to_tweet_id
-            FROM scheduled_tweets WHERE id = ?
-        ''', (tweet_id,))
+        Args:
+            now: Cut-off time (defaults to the current time)
+            limit: Maximum number of rows to return, oldest first
+        """
+        now = now or datetime.now()
+        return self.db.fetchall('''
+            SELECT id, content, scheduled_time, media_files, reply_to_tweet_id
+            FROM scheduled_tweets 
+            WHERE status = 'pending' AND scheduled_time <= ?
+            ORDER BY scheduled_time ASC
+            LIMIT ?
+        ''', (now.isoformat(sep=' '), limit))
+    
+    def _claim_scheduled_tweet(self, tweet_id: int):
+        """
+        Atomically move a tweet from 'pending' to 'posting'
+        
+        Returns the tweet's (content, media_files, reply_to_tweet_id, media_ids,
+        media_expires_at), or None if it was cancelled, already posted, or
+        claimed by another worker.
+        """
+        with self.db.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE scheduled_tweets 
+                SET status = 'posting', claimed_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'pending'
+            ''', (tweet_id,))
+            if cursor.rowcount != 1:
+                return None
+            
+            return conn.execute('''
+                SELECT content, media_files, reply_to_tweet_id, media_ids, media_expires_at
+                FROM scheduled_tweets WHERE id = ?
+            ''', (tweet_id,)).fetchone()
+    
+    def _finish_scheduled_tweet(self, tweet_id: int, status: str):
+        """Move a claimed tweet to its final status ('posted' or 'failed')"""
+        cursor = self.db.execute('''
+            UPDATE scheduled_tweets 
+            SET status = ?,
+                posted_at = CASE WHEN ? = 'posted' THEN CURRENT_TIMESTAMP ELSE posted_at END
+            WHERE id = ? AND status = 'posting'
+        ''', (status, status, tweet_id))
+        if cursor.rowcount:
+            self.events.publish(status, {'id': tweet_id})
+    
+    def _release_stale_claims(self):
+        """Fail tweets left in 'posting' by a process that died mid-post"""
+        cursor = self.db.execute('''
+            UPDATE scheduled_tweets SET status = 'failed'
+            WHERE status = 'posting' AND claimed_at <= datetime('now', ?)
+        ''', (f'-{int(self.stale_claim_minutes)} minutes',))
+        if cursor.rowcount:
+            print(f"⚠ Marked {cursor.rowcount} interrupted scheduled tweet(s) as failed")
+            self.events.publish('reset', {})
+    
+    def claim_scheduled_post(self, tweet_id: int) -> Optional[Dict]:
+        """
+        Claim a due tweet for posting
+        
+        Returns:
+            post_tweet_with_media() arguments (content, media_files,
+            reply_to_tweet_id, media_ids), or None if the tweet was cancelled,
+            already posted, claimed by another worker or unreadable
+        """
+        # Claim the tweet so concurrent workers never post it twice
+        result = self._claim_scheduled_tweet(tweet_id)
         
-        result = cursor.fetchone()
         if not result:
-            conn.close()
-            return False
+            return None
         
-        content, media_files_json, reply_to_tweet_id = result
+        content, media_files_json, reply_to_tweet_id, media_ids_json, media_expires_at = result
         
         try:
             media_files = json.loads(media_files_json) if media_files_json else None
             
-            # Post the tweet
-            tweet_result = None
-            if media_files:
-                tweet_result = self.post_tweet_with_media(content, media_files, reply_to_tweet_id)
-            else:
-                tweet_result = self.post_tweet(content, reply_to_tweet_id)
-            
-            # Check if post was successful
-            if tweet_result:
-                # Update status to posted
-                cursor.execute('''
-                    UPDATE scheduled_tweets 
-                    SET status = 'posted', posted_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                ''', (tweet_id,))
-                
-                conn.commit()
-                print(f"✓ Posted scheduled tweet #{tweet_id}")
-                return True
-            else:
-                # Post failed (returned None)
-                print(f"❌ Failed to post scheduled tweet #{tweet_id}: Post method returned None")
-                cursor.execute('''
-                    UPDATE scheduled_tweets SET status = 'failed'
-                    WHERE id = ?
-                ''', (tweet_id,))
-                conn.commit()
-                return False
+            # Use media uploaded ahead of time while X still holds it
+            media_ids = None
+            if media_ids_json and media_expires_at and \
+                    media_expires_at > time.time() + self.media_cache.safety_margin:
+                media_ids = json.loads(media_ids_json)
+        except ValueError as e:
+            self.finish_scheduled_post(tweet_id, None, e)
+            return None
+        
+        return {
+            'content': content,
+            'media_files': media_files,
+            'reply_to_tweet_id': reply_to_tweet_id,
+            'media_ids': media_ids
+        }
+    
+    def finish_scheduled_post(self, tweet_id: int, tweet_result, error: Exception = None,
+                              limited: bool = False) -> bool:
+        """
+        Record the outcome of posting a claimed tweet
+        
+        A post refused by a posting limit goes back to 'pending' for the next
+        slot; any other failure marks the tweet 'failed'.
+        
+        Args:
+            tweet_id: Scheduled tweet ID
+            tweet_result: ID of the posted tweet, or None if posting failed
+            error: Exception raised while posting, if any
+            limited: True if a posting limit (our 'post' bucket or X's 429)
+                refused the tweet
+        
+        Returns:
+            True if the tweet was posted
+        """
+        # Check if post was successful
+        if tweet_result:
+            # Update status to posted
+            self._finish_scheduled_tweet(tweet_id, 'posted')
             
-        except Exception as e:
-            print(f"❌ Failed to post scheduled tweet #{tweet_id}: {e}")
-            cursor.execute('''
-                UPDATE scheduled_tweets SET status = 'failed'
-                WHERE id = ?
-            ''', (tweet_id,))
-            conn.commit()
+            print(f"✓ Posted scheduled tweet #{tweet_id}")
+            return True
+        
+        if limited and error is None:
+            self._defer_scheduled_tweet(tweet_id)
             return False
-        finally:
-            conn.close()
+        
+        print(f"❌ Failed to post scheduled tweet #{tweet_id}: "
+              f"{error if error is not None else 'Post method returned None'}")
+        self._finish_scheduled_tweet(tweet_id, 'failed')
+        return False
+    
+    def post_scheduled_tweet(self, tweet_id: int):
+        """Post a scheduled tweet and update its status"""
+        post = self.claim_scheduled_post(tweet_id)
+        if not post:
+            return False
+        
+        try:
+            tweet_result, limited = self._post(
+                post['content'], post['reply_to_tweet_id'], post['media_files'], post['media_ids']
+            )
+        except Exception as e:
+            return self.finish_scheduled_post(tweet_id, None, e)
+        return self.finish_scheduled_post(tweet_id, tweet_result, limited=limited)
     
     def start_scheduler(self):
         """Start the background scheduler"""
@@ -270,65 +683,310 @@ class XBotEnhanced:
             return
         
         self.scheduler_running = True
-        scheduler_thread = threading.Thread(target=self._scheduler_loop, daemon=True)
-        scheduler_thread.start()
+        self._scheduler_thread = threading.Thread(target=self._scheduler_loop, daemon=True)
+        self._scheduler_thread.start()
         print("✓ Tweet scheduler started")
     
-    def stop_scheduler(self):
-        """Stop the background scheduler"""
+    def stop_scheduler(self, timeout: float = None):
+        """
+        Stop the background scheduler
+    
+        Args:
+            timeout: If given, wait up to this many seconds for posts in
+                flight to finish (used for graceful shutdown)
+        """
         self.scheduler_running = False
+        self.due_queue.wake()
+        if timeout is not None and self._scheduler_thread is not None:
+            self._scheduler_thread.join(timeout)
         print("✓ Tweet scheduler stopped")
     
+    @staticmethod
+    def _due_timestamp(scheduled_time) -> float:
+        """Convert a scheduled_time value (datetime or stored string) to a timestamp"""
+        if isinstance(scheduled_time, str):
+            scheduled_time = datetime.fromisoformat(scheduled_time)
+        return scheduled_time.timestamp()
+    
+    def _queue_entries(self, tweet_id: int, scheduled_time, needs_media: bool):
+        """
+        Due-queue entries for a pending tweet: the post itself, plus a
+        ('media', id) pre-upload job media_lookahead_minutes before it is due
+        """
+        due = self._due_timestamp(scheduled_time)
+        yield tweet_id, due
+        if needs_media:
+            yield ('media', tweet_id), due - self.media_lookahead_minutes * 60
+    
+    def _load_due_queue(self):
+        """Load every pending tweet into the in-memory due queue"""
+        self._synced_version = self.scheduled_tweets_version()
+        # Read the high-water mark first: a tweet inserted after this has a
+        # larger id and is found by the next _sync_due_queue()
+        last_id = self.db.fetchone('SELECT COALESCE(MAX(id), 0) FROM scheduled_tweets')[0]
+        rows = self.db.fetchall('''
+            SELECT id, scheduled_time, media_files IS NOT NULL AND media_ids IS NULL
+            FROM scheduled_tweets WHERE status = 'pending'
+        ''')
+        self.due_queue.load(
+            entry for row in rows for entry in self._queue_entries(*row)
+        )
+        self._last_synced_id = last_id
+        print(f"✓ Loaded {len(rows)} pending tweet(s) into scheduler")
+    
+    def _sync_due_queue(self):
+        """Pick up tweets scheduled by other processes sharing the database"""
+        rows = self.db.fetchall('''
+            SELECT id, scheduled_time, media_files IS NOT NULL AND media_ids IS NULL, status
+            FROM scheduled_tweets
+            WHERE id > ?
+            ORDER BY id
+        ''', (self._last_synced_id,))
+        for tweet_id, scheduled_time, needs_media, status in rows:
+            if status == 'pending':
+                for key, due in self._queue_entries(tweet_id, scheduled_time, needs_media):
+                    self.due_queue.push(key, due)
+        if rows:
+            self._last_synced_id = rows[-1][0]
+    
+    def _post_budget(self) -> int:
+        """Number of posts allowed right now by the 'post' limit and X's reported limit"""
+        self._configure_rate_limits()
+        budget = self.limiter.available('post')
+        remaining = self.rate_limits.remaining(CREATE_TWEET_ENDPOINT)
+        return budget if remaining is None else min(budget, remaining)
+    
+    def _next_post_slot(self) -> float:
+        """Timestamp at which the next post is allowed"""
+        return max(
+            time.time() + self.limiter.retry_after('post'),
+            self.rate_limits.next_available(CREATE_TWEET_ENDPOINT)
+        )
+    
+    def _defer_scheduled_tweet(self, tweet_id: int):
+        """
+        Put a claimed tweet refused by a posting limit back to 'pending'
+        
+        The 'post' bucket is shared with post_tweet, web posts and
+        auto-replies, so another caller may take the last token after the
+        scheduler's budget check. Retries at the next slot, and no sooner
+        than post_limit_retry_seconds since X's 429 may carry no reset time.
+        """
+        retry_at = max(self._next_post_slot(), time.time() + self.post_limit_retry_seconds)
+        self._release_scheduled_tweet(tweet_id, retry_at)
+        print(f"⏳ Scheduled tweet #{tweet_id} deferred by rate limit until "
+              f"{datetime.fromtimestamp(retry_at):%H:%M:%S}")
+    
+    def _release_scheduled_tweet(self, tweet_id: int, retry_at: float):
+        """Return a claimed tweet to 'pending' and retry it at retry_at"""
+        self.db.execute('''
+            UPDATE scheduled_tweets SET status = 'pending', claimed_at = NULL
+            WHERE id = ? AND status = 'posting'
+        ''', (tweet_id,))
+        self.due_queue.push(tweet_id, retry_at)
+    
+    def preupload_scheduled_media(self, tweet_id: int):
+        """Upload a pending tweet's media now and store the media IDs on its row"""
+        row = self.db.fetchone('''
+            SELECT media_files FROM scheduled_tweets
+            WHERE id = ? AND status = 'pending' AND media_ids IS NULL
+        ''', (tweet_id,))
+        if not row or not row[0] or not self.api:
+            return False
+        
+        try:
+            media_ids = upload_media_files(self.api, json.loads(row[0]), self.media_cache)
+        except Exception as e:
+            # Not fatal: the media is uploaded again at post time
+            print(f"⚠ Pre-upload failed for scheduled tweet #{tweet_id}: {e}")
+            return False
+        if not media_ids:
+            return False
+        
+        self.db.execute('''
+            UPDATE scheduled_tweets SET media_ids = ?, media_expires_at = ?
+            WHERE id = ? AND status = 'pending'
+        ''', (json.dumps(media_ids), self.media_cache.expiry(media_ids), tweet_id))
+        print(f"✓ Pre-uploaded media for scheduled tweet #{tweet_id}")
+        return True
+    
+    def next_due_batch(self, seen: set, batch_size: int = 100) -> List[int]:
+        """
+        IDs of the next due tweets to post, within the posting budget
+        
+        Reads only the due window from the database. When the budget is spent
+        the due tweets are re-queued for the next slot and nothing is returned.
+        
+        Args:
+            seen: IDs already handed out in this dispatch round (updated)
+            batch_size: Maximum due tweets read per call
+        
+        Returns:
+            Tweet IDs to post now; empty when there is nothing to post
+        """
+        budget = self._post_budget()
+        tweets = [t for t in self.get_due_tweets(limit=batch_size) if t[0] not in seen]
+        if not tweets:
+            return []
+        
+        if budget <= 0:
+            # Out of budget: re-queue for when the window frees up
+            retry_at = self._next_post_slot()
+            for tweet in tweets:
+                self.due_queue.push(tweet[0], retry_at)
+            print(f"⚠ Posting budget exhausted; {len(tweets)} tweet(s) deferred")
+            return []
+        
+        batch = [tweet[0] for tweet in tweets[:budget]]
+        for tweet_id in batch:
+            seen.add(tweet_id)
+            self.due_queue.remove(tweet_id)
+            self.due_queue.remove(('media', tweet_id))
+        return batch
+    
+    def _post_due_tweets(self, executor: ThreadPoolExecutor, batch_size: int = 100):
+        """Post every due tweet in parallel"""
+        seen = set()
+        while self.scheduler_running:
+            batch = self.next_due_batch(seen, batch_size)
+            if not batch:
+                return
+            # Post the batch concurrently; each row is claimed atomically
+            list(executor.map(self.post_scheduled_tweet, batch))
+    
+    def prepare_scheduler(self):
+        """Recover interrupted posts and load the due queue before a scheduler starts"""
+        self._release_stale_claims()
+        self._load_due_queue()
+        self.due_queue.push(('blob_gc',), time.time())
+    
+    def sync_due_queue(self):
+        """
+        Pick up tweets added by other processes (call when the due queue times out)
+        
+        Only queries scheduled_tweets when the scheduled_tweets_version
+        counter moved, so it is cheap to call every scheduler_poll_seconds.
+        """
+        # Read the counter first: a tweet added during the sync bumps it again
+        version = self.scheduled_tweets_version()
+        if version == self._synced_version:
+            return
+        self._synced_version = version
+        self._sync_due_queue()
+    
+    def split_due_keys(self, due_keys: List):
+        """
+        Sort due-queue keys into posting work and background jobs
+        
+        Returns:
+            (True if scheduled tweets are due, list of background callables for
+            media look-ahead and blob cleanup)
+        """
+        jobs = []
+        for key in due_keys:
+            if not isinstance(key, tuple):
+                continue
+            if key[0] == 'media':
+                jobs.append(lambda tweet_id=key[1]: self.preupload_scheduled_media(tweet_id))
+            elif key[0] == 'blob_gc':
+                jobs.append(self.collect_media_garbage)
+                self.due_queue.push(key, time.time() + self.blob_gc_seconds)
+        posts_due = any(not isinstance(key, tuple) for key in due_keys)
+        return posts_due, jobs
+    
     def _scheduler_loop(self):
         """Main scheduler loop - runs in background thread"""
+        try:
+            self.prepare_scheduler()
+        except Exception as e:
+            print(f"❌ Scheduler error: {e}")
+        
+        executor = ThreadPoolExecutor(
+            max_workers=max(self.dispatch_workers, 1),
+            thread_name_prefix="scheduled-post"
+        )
+        background = ThreadPoolExecutor(
+            max_workers=max(self.background_workers, 1),
+            thread_name_prefix="scheduler-background"
+        )
+        
         while self.scheduler_running:
             try:
-                # Get pending tweets that are due
-                now = datetime.now()
-                tweets = self.get_scheduled_tweets('pending')
+                # Sleep until the next deadline; schedule/cancel wake us early
+                due_keys = self.due_queue.wait(max_wait=self.scheduler_poll_seconds)
+                
+                if not due_keys:
+                    self.sync_due_queue()
+                    continue
                 
-                for tweet in tweets:
-                    tweet_id, content, scheduled_time, media_files, reply_to_tweet_id = tweet
-                    scheduled_dt = datetime.fromisoformat(scheduled_time)
-                    
-                    if scheduled_dt <= now:
-                        self.post_scheduled_tweet(tweet_id)
+                # Media look-ahead and cleanup jobs run on the background pool
+                posts_due, jobs = self.split_due_keys(due_keys)
+                for job in jobs:
+                    background.submit(job)
                 
-                # Sleep for 1 minute before checking again
-                time.sleep(60)
+                if posts_due:
+                    self._post_due_tweets(executor)
                 
             except Exception as e:
                 print(f"❌ Scheduler error: {e}")
-                time.sleep(60)
+                time.sleep(5)
+        
+        executor.shutdown(wait=True)
+        # Queued look-ahead uploads are redone on the next start
+        background.shutdown(wait=True, cancel_futures=True)
     
     # ===== AUTO-REPLY METHODS =====
     
-    def add_auto_reply_rule(self, keyword: str, response: str):
-        """Add a new auto-reply rule"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+    def add_auto_reply_rule(self, keyword: str, response: str,
+                            priority: int = 0, whole_word: bool = False):
+        """
+        Add a new auto-reply rule
         
-        cursor.execute('''
-            INSERT INTO auto_reply_rules (keyword, response)
-            VALUES (?, ?)
-        ''', (keyword, response))
+        Args:
+            keyword: Text to look for in mentions (case-insensitive)
+            response: Reply to send when the keyword matches
+            priority: Higher-priority rules win when several keywords match
+            whole_word: Only match the keyword as a whole word
+        """
+        self.rule_store.add(keyword, response, priority, whole_word)
         
-        conn.commit()
-        conn.close()
         print(f"✓ Added auto-reply rule for keyword: '{keyword}'")
     
     def get_auto_reply_rules(self):
         """Get all auto-reply rules"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+        return {keyword: response for keyword, response, _ in self.rule_store.rules()}
+    
+    def set_keyword_replies(self, keywords: List[str], response: str, source: str = 'web'):
+        """
+        Replace the keyword list configured from a UI
         
-        cursor.execute('''
-            SELECT keyword, response FROM auto_reply_rules WHERE enabled = 1
-        ''')
+        Args:
+            keywords: Keywords that should trigger the reply
+            response: Reply sent for any of the keywords
+            source: Owner of the rules; only this owner's previous rules are replaced
+        """
+        rules = {keyword: response for keyword in keywords if keyword.strip()}
+        self.rule_store.replace_source(source, rules.items())
+        self.auto_reply_config['keywords'] = rules
+    
+    def save_auto_reply_settings(self, enabled: bool, max_replies_per_hour: int,
+                                 cooldown_minutes: float):
+        """
+        Store the auto-reply switch and limits in the database
         
-        rules = cursor.fetchall()
-        conn.close()
-        return dict(rules)
+        For front ends where another process runs the monitor (the web app
+        with several workers); apply them there with auto_reply_settings().
+        """
+        self.set_state('auto_reply_settings', json.dumps({
+            'enabled': bool(enabled),
+            'max_replies_per_hour': int(max_replies_per_hour),
+            'cooldown_minutes': float(cooldown_minutes)
+        }))
+    
+    def auto_reply_settings(self) -> Optional[Dict]:
+        """Settings stored by save_auto_reply_settings(), or None if never saved"""
+        settings = self.get_state('auto_reply_settings')
+        return json.loads(settings) if settings else None
     
     def start_auto_reply(self):
         """Start monitoring for mentions and auto-replying"""
@@ -341,60 +999,178 @@ class XBotEnhanced:
             return
         
         self.auto_reply_running = True
-        reply_thread = threading.Thread(target=self._auto_reply_loop, daemon=True)
+        self._auto_reply_stop = threading.Event()
+        reply_thread = threading.Thread(
+            target=self._auto_reply_loop, args=(self._auto_reply_stop,), daemon=True
+        )
         reply_thread.start()
         print("✓ Auto-reply monitor started")
     
     def stop_auto_reply(self):
         """Stop the auto-reply monitor"""
         self.auto_reply_running = False
+        self._auto_reply_stop.set()
         print("✓ Auto-reply monitor stopped")
     
-    def _auto_reply_loop(self):
+    def _get_user_id(self):
+        """Return the authenticated account's user ID (looked up once)"""
+        if self.user_id is None:
+            self.user_id = self.get_state('user_id')
+        if self.user_id is None:
+            me = self.client.get_me(user_auth=True)
+            self.user_id = str(me.data.id)
+            self.set_state('user_id', self.user_id)
+        return self.user_id
+    
+    def update_mention_budget(self):
+        """Feed the mentions endpoint's reported limit to the poller"""
+        status = self.rate_limits.status(MENTIONS_ENDPOINT, 'app')
+        if status is not None:
+            _, remaining, reset_at = status
+            self.mention_poller.update_rate_limit(remaining, reset_at)
+    
+    def begin_mention_fetch(self, since_id: str = None, page_size: int = 100) -> MentionFetch:
+        """Start fetching every mention newer than since_id (see MentionFetch)"""
+        return MentionFetch(self._get_user_id(), since_id, page_size)
+    
+    def fetch_new_mentions(self, since_id: str = None, page_size: int = 100):
+        """
+        Fetch every mention newer than since_id, following pagination_token
+        
+        Returns:
+            (mentions oldest-first, newest mention ID or None)
+        """
+        fetch = self.begin_mention_fetch(since_id, page_size)
+        while not fetch.done:
+            try:
+                response = self.client.get_users_mentions(fetch.user_id, **fetch.next_request())
+            finally:
+                # Also on 429, so the poller waits for the window to reset
+                self.update_mention_budget()
+            fetch.add_page(response)
+        self._last_mention_requests = fetch.requests
+        return fetch.result()
+    
+    def complete_mention_poll(self, mention_count: int, newest_id: str = None,
+                              requests: int = None) -> float:
+        """
+        Record a finished poll and advance the saved mention cursor
+        
+        Call only after the batch was handled, so a crash replays it.
+        
+        Args:
+            mention_count: Mentions returned by the poll
+            newest_id: Newest mention ID, saved as the next since_id
+            requests: API requests the poll made (defaults to the last fetch_new_mentions)
+        
+        Returns:
+            Seconds to wait before the next poll
+        """
+        if requests is None:
+            requests = self._last_mention_requests
+        self.mention_poller.record_poll(mention_count, requests)
+        if newest_id:
+            self.set_state('mentions_since_id', newest_id)
+        return self.mention_poller.next_interval()
+    
+    def _auto_reply_loop(self, stop_event: threading.Event):
         """Main auto-reply loop - monitors mentions"""
-        last_mention_id = None
+        # Resume from the cursor saved by the previous run
+        last_mention_id = self.get_state('mentions_since_id')
         
-        while self.auto_reply_running:
+        while self.auto_reply_running and not stop_event.is_set():
             try:
                 # Check rate limiting
-                self._check_rate_limits()
+                self.check_rate_limits()
                 
-                # Get recent mentions
-                mentions = self.client.get_mentions(
-                    max_results=10,
-                    since_id=last_mention_id
-                )
+                # Drain every page of mentions since the cursor
+                mentions, newest_id = self.fetch_new_mentions(last_mention_id)
+                
+                if mentions:
+                    self._process_mentions(mentions)
                 
-                if mentions.data:
-                    last_mention_id = mentions.data[0].id
-                    self._process_mentions(mentions.data)
+                # Advance the cursor only after the batch was handled
+                interval = self.complete_mention_poll(len(mentions), newest_id)
+                last_mention_id = newest_id or last_mention_id
                 
-                # Sleep for 2 minutes before checking again
-                time.sleep(120)
+                # Sleep until the next poll; stop_auto_reply interrupts the wait
+                stop_event.wait(interval)
                 
             except Exception as e:
                 print(f"❌ Auto-reply error: {e}")
-                time.sleep(120)
+                stop_event.wait(self.mention_poller.next_interval())
     
-    def _process_mentions(self, mentions):
-        """Process mentions and send auto-replies"""
-        rules = self.get_auto_reply_rules()
+    def auto_reply_targets(self, mentions) -> List:
+        """
+        Mentions to answer, with their responses
         
+        Returns:
+            (mention, response) pairs for mentions not replied to yet whose
+            text matches a rule
+        """
+        matcher = self.rule_store.matcher()
+        
+        # Check the whole page against reply history at once
+        unreplied = set(self.filter_unreplied([mention.id for mention in mentions]))
+        
+        targets = []
         for mention in mentions:
-            # Check if we already replied to this tweet
-            if self._already_replied(mention.id):
+            # Skip tweets we already replied to
+            if str(mention.id) not in unreplied:
                 continue
             
-            # Check for keywords in the mention text
-            mention_text = mention.text.lower()
-            
-            for keyword, response in rules.items():
-                if keyword.lower() in mention_text:
-                    self._send_auto_reply(mention.id, response, mention.author_id)
-                    break
+            # Scan the mention once for every rule keyword
+            response = matcher.find_response(mention.text)
+            if response:
+                targets.append((mention, response))
+        return targets
+    
+    def _process_mentions(self, mentions):
+        """Process mentions and send auto-replies"""
+        for mention, response in self.auto_reply_targets(mentions):
+            self._send_auto_reply(mention.id, response, mention.author_id)
+    
+    def reserve_auto_reply(self, original_tweet_id: str, author_id: str,
+                           endpoint: str = REPLY_ENDPOINT) -> bool:
+        """
+        Check every reply limit and charge them if the reply may be sent
+        
+        Covers X's reported limit for the reply endpoint, the hourly reply cap,
+        the per-author cooldown and the shared posting budget.
+        
+        Args:
+            original_tweet_id: Mention being answered
+            author_id: Author of the mention
+            endpoint: Endpoint the reply is sent through (v1.1 statuses/update
+                here, POST /2/tweets from AsyncXBot)
+        """
+        # Don't spend our own budget on a request X would reject
+        blocked_until = self.rate_limits.next_available(endpoint)
+        if blocked_until > time.time():
+            print(f"⏳ Skipping auto-reply to {original_tweet_id}: X rate limit "
+                  f"(retry in {blocked_until - time.time():.0f}s)")
+            return False
+        
+        # Hourly reply cap, per-author cooldown and the shared posting budget
+        self._configure_rate_limits()
+        limits = [('replies', ''), ('author_cooldown', author_id), ('post', '')]
+        if not self.limiter.try_acquire_all(limits):
+            name, wait = self.limiter.blocking_limit(limits) or ('replies', 0)
+            print(f"⏳ Skipping auto-reply to {original_tweet_id}: '{name}' limit (retry in {wait:.0f}s)")
+            return False
+        return True
+    
+    def record_auto_reply(self, original_tweet_id: str, reply_tweet_id: str):
+        """Record a sent auto-reply"""
+        self._record_reply(str(original_tweet_id), str(reply_tweet_id))
+        print(f"✓ Auto-reply sent to tweet {original_tweet_id}")
+        self.reply_count += 1
     
     def _send_auto_reply(self, original_tweet_id: str, response: str, author_id: str):
         """Send an auto-reply"""
+        if not self.reserve_auto_reply(original_tweet_id, author_id):
+            return False
+        
         try:
             # Post reply
             reply_tweet = self.api.update_status(
@@ -403,101 +1179,165 @@ class XBotEnhanced:
             )
             
             # Record the reply
-            self._record_reply(original_tweet_id, reply_tweet.id_str)
-            
-            print(f"✓ Auto-reply sent to tweet {original_tweet_id}")
-            self.reply_count += 1
+            self.record_auto_reply(original_tweet_id, reply_tweet.id_str)
+            return True
             
         except Exception as e:
             print(f"❌ Failed to send auto-reply: {e}")
+            return False
     
     def _already_replied(self, tweet_id: str) -> bool:
         """Check if we already replied to this tweet"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+        return not self.filter_unreplied([tweet_id])
+    
+    def _init_replied_cache(self):
+        """Seed the replied-ID cache from the most recent reply history"""
+        with self._replied_lock:
+            if self._replied_floor is not None:
+                return
+            recent = self.db.fetchall('''
+                SELECT original_tweet_id FROM reply_history
+                ORDER BY id DESC LIMIT ?
+            ''', (self._replied_cache.maxsize,))
+            for (tweet_id,) in reversed(recent):
+                self._replied_cache.add(str(tweet_id))
+            floor = self.db.fetchone('''
+                SELECT MAX(CAST(original_tweet_id AS INTEGER)) FROM reply_history
+            ''')[0]
+            self._replied_floor = floor or 0
+    
+    def _remember_reply(self, tweet_id: str):
+        """Add a replied ID to the cache, keeping the completeness floor valid"""
+        evicted = self._replied_cache.add(str(tweet_id))
+        if evicted is not None:
+            with self._replied_lock:
+                self._replied_floor = max(self._replied_floor, int(evicted))
+    
+    def filter_unreplied(self, tweet_ids: List[str]) -> List[str]:
+        """
+        Return the IDs (as strings) we have not replied to yet, in input order
         
-        cursor.execute('''
-            SELECT COUNT(*) FROM reply_history 
-            WHERE original_tweet_id = ?
-        ''', (tweet_id,))
+        IDs above the cache floor are answered from memory; only older IDs that
+        miss the cache are checked in one indexed IN (...) query per 500 IDs.
+        """
+        self._init_replied_cache()
+        ids = [str(tweet_id) for tweet_id in tweet_ids]
+        floor = self._replied_floor
+        
+        to_check = [i for i in ids if i not in self._replied_cache and int(i) <= floor]
+        replied = set()
+        for start in range(0, len(to_check), 500):
+            chunk = to_check[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.db.fetchall(f'''
+                SELECT DISTINCT original_tweet_id FROM reply_history
+                WHERE original_tweet_id IN ({placeholders})
+            ''', chunk)
+            replied.update(str(row[0]) for row in rows)
         
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count > 0
+        return [i for i in ids if i not in replied and i not in self._replied_cache]
     
     def _record_reply(self, original_tweet_id: str, reply_tweet_id: str):
         """Record a reply in the database"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        self.db.execute('''
             INSERT INTO reply_history (original_tweet_id, reply_tweet_id)
             VALUES (?, ?)
         ''', (original_tweet_id, reply_tweet_id))
-        
-        conn.commit()
-        conn.close()
+        self._remember_reply(original_tweet_id)
+        self.events.publish('auto_reply', {
+            'tweet_id': str(original_tweet_id),
+            'reply_id': str(reply_tweet_id)
+        })
+    
+    def _configure_rate_limits(self):
+        """Apply the current config to the limiter (cheap when unchanged)"""
+        config = self.auto_reply_config
+        self.limiter.configure('replies', max(int(config['max_replies_per_hour']), 0), 3600)
+        self.limiter.configure('author_cooldown', 1, max(float(config['cooldown_minutes']), 0) * 60)
+        self.limiter.configure('post', self.posts_per_window, self.post_window_seconds)
     
-    def _check_rate_limits(self):
-        """Check and reset rate limiting counters"""
+    def check_rate_limits(self):
+        """Check and reset rate limiting counters (once per mention poll)"""
+        self._configure_rate_limits()
         now = datetime.now()
         if now - self.last_reply_reset >= timedelta(hours=1):
             self.reply_count = 0
             self.last_reply_reset = now
+            self.limiter.prune()
+            self.media_cache.prune()
     
     def cancel_scheduled_tweet(self, tweet_id: int):
-        """Cancel a scheduled tweet"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
+        """Cancel a scheduled tweet that has not started posting"""
         try:
-            cursor.execute('''
+            # Only pending tweets: one being posted (or already posted) stays as it is
+            cursor = self.db.execute('''
                 UPDATE scheduled_tweets 
                 SET status = 'cancelled'
-                WHERE id = ?
+                WHERE id = ? AND status = 'pending'
             ''', (tweet_id,))
+            if cursor.rowcount != 1:
+                print(f"❌ Scheduled tweet #{tweet_id} is not pending and can't be cancelled")
+                return False
             
-            conn.commit()
+            self.due_queue.remove(int(tweet_id))
+            self.due_queue.remove(('media', int(tweet_id)))
+            self.events.publish('cancelled', {'id': int(tweet_id)})
             print(f"✓ Scheduled tweet #{tweet_id} cancelled")
             return True
         except Exception as e:
             print(f"❌ Failed to cancel tweet #{tweet_id}: {e}")
             return False
-        finally:
-            conn.close()
     
     # ===== BASIC TWEET METHODS (from original bot) =====
     
+    def acquire_post_slot(self) -> bool:
+        """Charge one post against the 'post' limit, reporting when it is exhausted"""
+        self._configure_rate_limits()
+        if self.limiter.try_acquire('post'):
+            return True
+        wait = self.limiter.retry_after('post')
+        print(f"❌ Posting limit reached. Next post allowed in {wait:.0f}s.")
+        return False
+    
     def post_tweet(self, content: str, reply_to_tweet_id: str = None):
         """Post a simple text tweet"""
-        if not self.client:
-            print("❌ Not authenticated. Check your credentials.")
-            return None
+        return self._post(content, reply_to_tweet_id)[0]
+    
+    def upload_tweet_media(self, media_files: List, media_ids: List[int] = None):
+        """
+        Media IDs for a tweet, uploading only what X doesn't already hold
         
-        try:
-            # Use v2 API Client (works with Free tier)
-            response = self.client.create_tweet(
-                text=content,
-                in_reply_to_tweet_id=reply_to_tweet_id
-            )
-            
-            if response.data:
-                tweet_id = response.data['id']
-                print(f"✓ Tweet posted: {tweet_id}")
-                return str(tweet_id)
-            else:
-                print("❌ No response data from API")
-                return None
-            
-        except tweepy.TooManyRequests:
-            print("❌ Rate limit exceeded. Please wait before posting again.")
-        except Exception as e:
-            print(f"❌ Failed to post tweet: {e}")
-        return None
+        Upload media files using v1.1 API (media upload still supported on Free tier).
+        Uploads run concurrently; IDs keep the order of media_files and
+        byte-identical files reuse a still-valid media ID.
+        
+        Returns:
+            (media IDs, the subset that was reused rather than freshly uploaded)
+        """
+        if media_ids:
+            return list(media_ids), list(media_ids)
+        reused_ids = []
+        media_ids = upload_media_files(self.api, media_files, self.media_cache, reused_ids)
+        return media_ids, reused_ids
+    
+    def reupload_tweet_media(self, media_files: List, reused_ids: List[int]) -> List[int]:
+        """Upload media again after X rejected reused media IDs"""
+        # A cached media ID may have been dropped by X early; upload fresh once
+        self.media_cache.forget(reused_ids)
+        return upload_media_files(self.api, media_files)
     
     def post_tweet_with_media(self, content: str, media_files: List[str], 
-                             reply_to_tweet_id: str = None):
-        """Post a tweet with media"""
+                             reply_to_tweet_id: str = None, media_ids: List[int] = None):
+        """
+        Post a tweet with media
+        
+        Args:
+            content: Tweet content
+            media_files: Image file paths, or (filename, file-like) pairs for in-memory uploads
+            reply_to_tweet_id: ID of tweet to reply to
+            media_ids: Media IDs already uploaded for media_files; the files are
+                uploaded again only if X rejects them
+        """
         if not self.client or not self.api:
             print("❌ Not authenticated. Check your credentials.")
             return None
@@ -505,39 +1345,62 @@ class XBotEnhanced:
         if not media_files:
             return self.post_tweet(content, reply_to_tweet_id)
         
+        return self._post(content, reply_to_tweet_id, media_files, media_ids)[0]
+    
+    def _post(self, content: str, reply_to_tweet_id: str = None,
+              media_files: List = None, media_ids: List[int] = None) -> Tuple[Optional[str], bool]:
+        """
+        Post a tweet, with media when media_files is given
+        
+        Returns:
+            (tweet ID or None, True if a posting limit - ours or X's 429 -
+            refused the tweet, so it may succeed later)
+        """
+        if not self.client or (media_files and not self.api):
+            print("❌ Not authenticated. Check your credentials.")
+            return None, False
+        
+        if not self.acquire_post_slot():
+            return None, True
+        
+        kind = 'tweet with media' if media_files else 'tweet'
         try:
-            # Upload media files using v1.1 API (media upload still supported on Free tier)
-            media_ids = []
-            for media_file in media_files:
-                if os.path.exists(media_file):
-                    media = self.api.media_upload(media_file)
-                    media_ids.append(media.media_id)
-                    print(f"✓ Uploaded media: {media_file}")
-                else:
-                    print(f"⚠ Media file not found: {media_file}")
-            
-            if not media_ids:
-                print("❌ No valid media files found")
-                return None
+            if media_files:
+                media_ids, reused_ids = self.upload_tweet_media(media_files, media_ids)
+                
+                if not media_ids:
+                    print("❌ No valid media files found")
+                    return None, False
             
-            # Post tweet with media using v2 API Client (works with Free tier)
-            response = self.client.create_tweet(
-                text=content,
-                media_ids=media_ids,
-                in_reply_to_tweet_id=reply_to_tweet_id
-            )
+            # Use v2 API Client (works with Free tier)
+            try:
+                response = self.client.create_tweet(
+                    text=content,
+                    media_ids=media_ids if media_files else None,
+                    in_reply_to_tweet_id=reply_to_tweet_id
+                )
+            except tweepy.BadRequest:
+                if not media_files or not reused_ids:
+                    raise
+                media_ids = self.reupload_tweet_media(media_files, reused_ids)
+                response = self.client.create_tweet(
+                    text=content,
+                    media_ids=media_ids,
+                    in_reply_to_tweet_id=reply_to_tweet_id
+                )
             
             if response.data:
                 tweet_id = response.data['id']
-                print(f"✓ Tweet with media posted: {tweet_id}")
-                return str(tweet_id)
-            else:
-                print("❌ No response data from API")
-                return None
+                print(f"✓ {kind.capitalize()} posted: {tweet_id}")
+                return str(tweet_id), False
+            print("❌ No response data from API")
             
+        except tweepy.TooManyRequests:
+            print("❌ Rate limit exceeded. Please wait before posting again.")
+            return None, True
         except Exception as e:
-            print(f"❌ Failed to post tweet with media: {e}")
-        return None
+            print(f"❌ Failed to post {kind}: {e}")
+        return None, False
     
     def delete_tweet(self, tweet_id: str):
         """Delete a tweet by ID"""
@@ -0,0 +1,214 @@
+"""
+X Bot Events - Publish/subscribe bus for live status updates
+The scheduler and the auto-reply engine publish what happens (tweet scheduled,
+posted, failed, cancelled, auto-reply sent); the web UI streams it to the
+browser as Server-Sent Events instead of re-polling the full list. Events go
+through the events table, so every process sharing the database sees them.
+"""
+
+import json
+import queue
+import threading
+from typing import Optional
+
+# Recent events kept in the events table for clients that reconnect
+HISTORY_SIZE = 500
+
+# Events buffered per subscriber before it is dropped as too slow
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# How often other processes' events are picked up while anyone is subscribed
+RELAY_POLL_SECONDS = 1.0
+
+
+class Event:
+    """One published event; its ID is the events table row ID"""
+
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, event_id: int, event_type: str, data: dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def to_sse(self) -> str:
+        """Format the event as a Server-Sent Events message"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """A subscriber's queue of events; closed when it falls behind or the bus closes"""
+
+    def __init__(self, maxsize: int):
+        self._queue = queue.Queue(maxsize)
+        self.closed = False
+
+    def get(self, timeout: float = None) -> Optional[Event]:
+        """Next event, or None on timeout or once the subscription is closed"""
+        if self.closed and self._queue.empty():
+            return None
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _put(self, event: Optional[Event]) -> bool:
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def _close(self):
+        self.closed = True
+        # Wake a reader blocked in get(); a full queue already wakes it
+        self._put(None)
+
+
+class EventBus:
+    """
+    Fan-out of events to every subscriber in every process
+
+    publish() appends a row to the events table; while a process has
+    subscribers, a relay thread tails the table and delivers new rows in ID
+    order, woken at once by local publishes and every RELAY_POLL_SECONDS for
+    other processes' (e.g. the web worker running the scheduler). Event IDs
+    are row IDs, so they mean the same in every worker and across restarts:
+    a client that reconnects with the last ID it saw gets the missed events
+    replayed, or a 'reset' event if they have been pruned.
+
+    Subscribers have bounded queues; one that stops reading is closed
+    rather than slowing the relay down.
+    """
+
+    def __init__(self, db, history_size: int = HISTORY_SIZE,
+                 subscriber_queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+                 poll_seconds: float = RELAY_POLL_SECONDS):
+        """
+        Args:
+            db: ConnectionPool with the events table
+            history_size: Recent events kept for replay on reconnect
+            subscriber_queue_size: Events buffered per subscriber
+            poll_seconds: Interval for picking up other processes' events
+        """
+        self.db = db
+        self.history_size = history_size
+        self.subscriber_queue_size = subscriber_queue_size
+        self.poll_seconds = poll_seconds
+        self._subscribers = set()
+        self._last_id = 0
+        self._relay = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, data: dict):
+        """Send an event to every subscriber; never raises"""
+        try:
+            event_id = self.db.execute('''
+                INSERT INTO events (type, data) VALUES (?, ?)
+            ''', (event_type, json.dumps(data))).lastrowid
+            if event_id % 100 == 0:
+                self.db.execute('DELETE FROM events WHERE id <= ?', (event_id - self.history_size,))
+        except Exception as e:
+            print(f"⚠ Failed to publish {event_type} event: {e}")
+            return
+        self._wake.set()
+
+    def _max_id(self) -> int:
+        return self.db.fetchone('SELECT COALESCE(MAX(id), 0) FROM events')[0]
+
+    def subscribe(self, last_event_id: str = None) -> Subscription:
+        """
+        Start receiving events
+
+        Args:
+            last_event_id: ID of the last event the client saw; newer events
+                still in the events table are delivered first
+
+        Returns:
+            Subscription to read events from; pass it to unsubscribe() when done
+        """
+        subscription = Subscription(self.subscriber_queue_size)
+        with self._lock:
+            if self._relay is None:
+                # Start from the newest event; older ones are only replayed
+                self._last_id = self._max_id()
+                self._relay = threading.Thread(target=self._relay_loop, name="event-relay", daemon=True)
+                self._relay.start()
+
+            if last_event_id:
+                for event in self._missed_events(last_event_id):
+                    subscription._put(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _missed_events(self, last_event_id: str):
+        """Events after last_event_id up to those already relayed, or a 'reset'"""
+        reset = [Event(self._last_id, 'reset', {})]
+        if not last_event_id.isdigit():
+            return reset
+        last_seen = int(last_event_id)
+        if last_seen == self._last_id:
+            return []
+        rows = self.db.fetchall('''
+            SELECT id, type, data FROM events
+            WHERE id >= ? AND id <= ?
+            ORDER BY id
+            LIMIT ?
+        ''', (last_seen, self._last_id, self.subscriber_queue_size + 1))
+        # The client's own last event must still be there, or some were pruned
+        # (or the ID is from another database): the client must reload
+        if last_seen > self._last_id or not rows or rows[0][0] != last_seen or \
+                len(rows) > self.subscriber_queue_size:
+            return reset
+        return [Event(event_id, event_type, json.loads(data)) for event_id, event_type, data in rows[1:]]
+
+    def _relay_loop(self):
+        """Deliver new rows of the events table until nobody is subscribed"""
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._relay = None
+                    return
+                after = self._last_id
+            self._wake.clear()
+
+            try:
+                rows = self.db.fetchall('''
+                    SELECT id, type, data FROM events WHERE id > ? ORDER BY id LIMIT 500
+                ''', (after,))
+            except Exception as e:
+                print(f"⚠ Event relay error: {e}")
+                rows = []
+
+            if rows:
+                events = [Event(event_id, event_type, json.loads(data))
+                          for event_id, event_type, data in rows]
+                with self._lock:
+                    self._last_id = events[-1].id
+                    subscribers = list(self._subscribers)
+                for subscription in subscribers:
+                    if not all(subscription._put(event) for event in events):
+                        print("⚠ Dropping slow event subscriber")
+                        self.unsubscribe(subscription)
+                        subscription._close()
+                continue
+
+            self._wake.wait(self.poll_seconds)
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop delivering events to a subscription"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def close(self):
+        """Close every subscription (e.g. at shutdown) so open streams end"""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, set()
+            relay = self._relay
+        for subscription in subscribers:
+            subscription._close()
+        # Let the relay exit before the database is closed
+        self._wake.set()
+        if relay is not None and relay is not threading.current_thread():
+            relay.join(timeout=2)
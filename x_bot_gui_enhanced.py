@@ -491,7 +491,7 @@ class XBotEnhancedGUI:
         """Add images to the tweet"""
         files = filedialog.askopenfilenames(
             title="Select Images",
-            filetypes=[("Image files", "*.jpg *.jpeg *.png *.gif *.bmp")]
+            filetypes=[("Media files", "*.jpg *.jpeg *.png *.gif *.bmp *.mp4 *.mov")]
         )
         
         for file in files:
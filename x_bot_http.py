@@ -0,0 +1,75 @@
+"""
+X Bot HTTP - Process-wide HTTP transport for the tweepy clients
+Every tweepy.Client and tweepy.API in the process sends requests through one
+pooled HTTPAdapter, so uploads and posts reuse warm keep-alive connections
+instead of paying a TCP + TLS handshake per call
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Hosts we talk to: api.twitter.com, upload.twitter.com, api.x.com, ...
+POOL_CONNECTIONS = 4
+
+# Connections kept per host; covers concurrent media uploads plus posting
+POOL_MAXSIZE = 16
+
+_adapter = None
+_adapter_lock = threading.Lock()
+
+
+def get_shared_adapter() -> HTTPAdapter:
+    """Return the process-wide connection-pooling adapter, creating it on first use"""
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                # Retries stay with tweepy, which knows which errors are safe to retry
+                _adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    max_retries=0
+                )
+    return _adapter
+
+
+class PooledSession(requests.Session):
+    """
+    Session backed by the shared adapter
+
+    Each client keeps its own session (headers, hooks) but all of them share
+    one connection pool. tweepy.API closes its session after every request,
+    so close() only drops this session and leaves the pooled connections open.
+    """
+
+    def __init__(self):
+        super().__init__()
+        adapter = get_shared_adapter()
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def close(self):
+        pass
+
+
+def use_shared_transport(*clients):
+    """
+    Route tweepy clients through the shared connection pool
+
+    Args:
+        clients: tweepy.Client / tweepy.API instances (None entries are skipped)
+    """
+    for client in clients:
+        if client is not None:
+            client.session = PooledSession()
+
+
+def close_shared_transport():
+    """Close every pooled connection; call once at process shutdown"""
+    global _adapter
+    with _adapter_lock:
+        adapter, _adapter = _adapter, None
+    if adapter is not None:
+        adapter.close()
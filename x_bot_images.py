@@ -0,0 +1,325 @@
+"""
+X Bot Images - Optional image preprocessing before upload
+Downscales images to X's display limits, strips metadata and re-encodes them
+under a byte budget on a process pool, caching results by content hash.
+Requires Pillow (pip install Pillow); without it images are uploaded unchanged.
+"""
+
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from typing import List
+
+from x_bot_media import file_digest, media_name, open_media
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# X displays images at most 4096px on the long edge
+MAX_DIMENSION = 4096
+
+# Target size for re-encoded images; X rejects images over 5 MB
+MAX_IMAGE_BYTES = 1024 * 1024
+
+# Formats worth re-encoding; GIFs (possibly animated) and videos pass through
+PROCESSABLE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff'}
+
+JPEG_QUALITIES = (90, 85, 80, 75, 70, 60)
+
+# Processed-image cache limits; least recently used files are removed first
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_MAX_AGE_SECONDS = 24 * 60 * 60
+CACHE_PRUNE_INTERVAL_SECONDS = 10 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _encode(image, fmt: str, quality: int = None) -> bytes:
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def preprocess_image(source, destination_base: str,
+                     max_dimension: int = MAX_DIMENSION,
+                     max_bytes: int = MAX_IMAGE_BYTES):
+    """
+    Shrink one image and write it next to destination_base
+
+    Runs in a worker process. Images are rotated according to their EXIF
+    orientation, then saved without EXIF/ICC metadata: opaque images as
+    progressive JPEG, images with transparency as optimized PNG. Quality and
+    then dimensions are stepped down until the result fits max_bytes.
+
+    Args:
+        source: Path or bytes of the original image
+        destination_base: Output path without extension
+        max_dimension: Longest edge in pixels
+        max_bytes: Byte budget for the encoded image
+
+    Returns:
+        Path of the processed image, or None if the original is already smaller
+    """
+    if isinstance(source, bytes):
+        source_size, source = len(source), BytesIO(source)
+    else:
+        source_size = os.path.getsize(source)
+
+    with Image.open(source) as original:
+        original_size = original.size
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info
+        )
+        if has_alpha:
+            image = image.convert('RGBA')
+            # Screenshots are often RGBA with every pixel opaque; encode those as JPEG
+            if image.getchannel('A').getextrema() == (255, 255):
+                has_alpha = False
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    fmt, extension = ('PNG', '.png') if has_alpha else ('JPEG', '.jpg')
+
+    while True:
+        if fmt == 'JPEG':
+            for quality in JPEG_QUALITIES:
+                data = _encode(image, fmt, quality)
+                if len(data) <= max_bytes:
+                    break
+        else:
+            data = _encode(image, fmt)
+        if len(data) <= max_bytes or max(image.size) <= 512:
+            break
+        image = image.resize((image.width * 3 // 4, image.height * 3 // 4), Image.LANCZOS)
+
+    if len(data) >= source_size and image.size == original_size:
+        # Re-encoding did not help; keep the original bytes
+        return None
+
+    destination = destination_base + extension
+    temp_path = destination + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, destination)
+    return destination
+
+
+def get_preprocess_executor() -> ProcessPoolExecutor:
+    """Return the shared preprocessing process pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # Spawned, not forked: the web app and the bot are multi-threaded,
+                # and a forked child can deadlock on a lock held at fork time
+                _executor = ProcessPoolExecutor(
+                    max_workers=min(os.cpu_count() or 1, 4),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _executor
+
+
+def shutdown_preprocess_executor():
+    """Stop the preprocessing worker processes (at process exit)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ImagePreprocessor:
+    """
+    Content-addressed cache of preprocessed images
+
+    Each image is keyed by the SHA-256 of its original bytes, so the same
+    picture is only processed once however often it is posted. Concurrent
+    requests for the same content share one in-flight job. The cache is
+    pruned by age and total size, least recently used files first.
+    """
+
+    def __init__(self, cache_dir: str, max_dimension: int = MAX_DIMENSION,
+                 max_bytes: int = MAX_IMAGE_BYTES,
+                 cache_max_bytes: int = CACHE_MAX_BYTES,
+                 cache_max_age: float = CACHE_MAX_AGE_SECONDS):
+        """
+        Args:
+            cache_dir: Directory for processed images
+            max_dimension: Longest edge in pixels
+            max_bytes: Byte budget per image
+            cache_max_bytes: Total size the cache is pruned down to
+            cache_max_age: Cached files unused for longer than this are removed
+        """
+        self.cache_dir = cache_dir
+        self.max_dimension = max_dimension
+        self.max_bytes = max_bytes
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_max_age = cache_max_age
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return PIL_AVAILABLE
+
+    def _cached(self, digest: str):
+        for extension in ('.jpg', '.png'):
+            path = os.path.join(self.cache_dir, digest + extension)
+            try:
+                # Mark as recently used so prune() keeps it
+                os.utime(path)
+                return path
+            except FileNotFoundError:
+                continue
+        return None
+
+    def prune(self) -> int:
+        """
+        Remove cached images that are too old, then the least recently used
+        ones until the cache fits cache_max_bytes
+
+        Returns:
+            Number of files removed
+        """
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file(follow_symlinks=False):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.cache_max_age and total <= self.cache_max_bytes:
+                break
+            # Keep files written in the last minute: they may be about to upload
+            if now - mtime < 60:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        if removed:
+            print(f"✓ Removed {removed} cached image(s)")
+        return removed
+
+    def _maybe_prune(self):
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < CACHE_PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = now
+        try:
+            self.prune()
+        except OSError as e:
+            print(f"⚠ Image cache cleanup failed: {e}")
+
+    def submit(self, media) -> Future:
+        """
+        Start preprocessing an image
+
+        Args:
+            media: Image path, (filename, file-like or bytes) pair, or named
+                file-like object
+
+        Returns:
+            Future resolving to the path of the processed image, or None when
+            the original should be uploaded as is
+        """
+        extension = os.path.splitext(media_name(media))[1].lower()
+        if not PIL_AVAILABLE or extension not in PROCESSABLE_EXTENSIONS:
+            done = Future()
+            done.set_result(None)
+            return done
+
+        digest = file_digest(media)
+        with self._lock:
+            cached = self._cached(digest)
+            if cached:
+                done = Future()
+                done.set_result(cached)
+                return done
+            future = self._pending.get(digest)
+            if future is not None:
+                return future
+            if isinstance(media, str):
+                source = media
+            else:
+                # In-memory uploads are handed to the worker process as bytes
+                with open_media(media) as f:
+                    source = f.read()
+            future = get_preprocess_executor().submit(
+                preprocess_image, source, os.path.join(self.cache_dir, digest),
+                self.max_dimension, self.max_bytes
+            )
+            self._pending[digest] = future
+        # Registered outside the lock: it runs inline if the job already finished
+        future.add_done_callback(lambda _: self._forget(digest))
+        return future
+
+    def _forget(self, digest: str):
+        with self._lock:
+            self._pending.pop(digest, None)
+
+    def save_uploads(self, media_items: List) -> List[str]:
+        """
+        Save uploaded images to the cache as they are, for a background job
+
+        Writes each upload once and does no processing, so a request can hand
+        its images to a job and return at once; the job passes the paths to
+        process_all(). Like the rest of the cache, these files are pruned, so
+        use them promptly.
+        """
+        return [self._save_original(media) for media in media_items]
+
+    def _save_original(self, media) -> str:
+        extension = os.path.splitext(media_name(media))[1].lower()
+        path = os.path.join(self.cache_dir, f"{file_digest(media)}-original{extension}")
+        if not os.path.exists(path):
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open_media(media) as source, open(temp_path, 'wb') as f:
+                shutil.copyfileobj(source, f)
+            os.replace(temp_path, path)
+        return path
+
+    def process_all(self, media_items: List) -> List:
+        """
+        Preprocess images in parallel and return the media to upload
+
+        Each item is replaced by the path of its optimized copy; items that
+        are not processed, or fail to process, are returned unchanged.
+        """
+        self._maybe_prune()
+        futures = [(media, self.submit(media)) for media in media_items]
+        results = []
+        for media, future in futures:
+            try:
+                processed = future.result()
+            except Exception as e:
+                print(f"⚠ Image preprocessing failed for {media_name(media)}: {e}")
+                processed = None
+            if processed:
+                size_kb = os.path.getsize(processed) // 1024
+                print(f"✓ Optimized {media_name(media)} ({size_kb} KB)")
+                results.append(processed)
+            else:
+                results.append(media)
+        return results
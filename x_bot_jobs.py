@@ -0,0 +1,173 @@
+"""
+X Bot Jobs - SQLite-backed background job queue
+Web requests enqueue work and return at once; a pool of worker threads claims
+jobs from the jobs table, runs them and records the result for /jobs/<id>
+"""
+
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# Job lifecycle: queued -> running -> succeeded / failed
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class JobQueue:
+    """
+    Durable queue of jobs run by a pool of worker threads
+
+    Jobs are rows in the jobs table, so they survive restarts and can be
+    enqueued by any process sharing the database. Each job is claimed with an
+    atomic queued -> running update, so a job runs once even with several
+    worker pools on one database. Workers are woken immediately by enqueue()
+    and poll every poll_seconds for jobs added by other processes.
+
+    A job left 'running' may have been interrupted, or may still be running
+    in another process, so only kinds listed as idempotent are re-queued;
+    the rest are marked failed rather than risk e.g. posting a tweet twice.
+    """
+
+    def __init__(self, db, handlers: Dict[str, Callable[[dict], dict]],
+                 workers: int = 4, poll_seconds: float = 5.0,
+                 stale_minutes: float = 10, idempotent_kinds: Iterable[str] = ()):
+        """
+        Args:
+            db: ConnectionPool with the jobs table
+            handlers: Job kind -> function taking the payload dict and returning
+                a JSON-serializable result dict
+            workers: Number of worker threads
+            poll_seconds: Idle re-check interval for jobs from other processes
+            stale_minutes: Running jobs older than this at start() are re-queued
+                (idempotent kinds) or marked failed (every other kind)
+            idempotent_kinds: Job kinds that are safe to run more than once
+        """
+        self.db = db
+        self.handlers = handlers
+        self.idempotent_kinds = set(idempotent_kinds)
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.stale_minutes = stale_minutes
+        self.running = False
+        self._threads = []
+        self._cond = threading.Condition()
+
+    def start(self):
+        """Start the worker threads"""
+        if self.running:
+            return
+        self.running = True
+        self._requeue_stale_jobs()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"✓ Job queue started ({self.workers} workers)")
+
+    def stop(self, timeout: float = None):
+        """Stop the workers after their current job"""
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(deadline - time.time(), 0))
+        self._threads = []
+
+    def enqueue(self, kind: str, payload: dict) -> int:
+        """Queue a job and return its ID"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        cursor = self.db.execute('''
+            INSERT INTO jobs (kind, payload, status) VALUES (?, ?, ?)
+        ''', (kind, json.dumps(payload), QUEUED))
+        with self._cond:
+            self._cond.notify()
+        return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[dict]:
+        """Status of a job, or None if it doesn't exist"""
+        row = self.db.fetchone('''
+            SELECT id, kind, status, result, error, created_at, started_at, finished_at
+            FROM jobs WHERE id = ?
+        ''', (job_id,))
+        if not row:
+            return None
+        job_id, kind, status, result, error, created_at, started_at, finished_at = row
+        return {
+            'id': job_id,
+            'kind': kind,
+            'status': status,
+            'result': json.loads(result) if result else None,
+            'error': error,
+            'created_at': created_at,
+            'started_at': started_at,
+            'finished_at': finished_at
+        }
+
+    def _requeue_stale_jobs(self):
+        """Recover jobs left 'running' by a process that died"""
+        cutoff = f'-{int(self.stale_minutes)} minutes'
+        kinds = sorted(self.idempotent_kinds)
+        placeholders = ', '.join('?' * len(kinds))
+        with self.db.transaction() as conn:
+            requeued = conn.execute(f'''
+                UPDATE jobs SET status = ?, started_at = NULL
+                WHERE status = ? AND started_at <= datetime('now', ?)
+                AND kind IN ({placeholders})
+            ''', (QUEUED, RUNNING, cutoff, *kinds)).rowcount
+            failed = conn.execute('''
+                UPDATE jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE status = ? AND started_at <= datetime('now', ?)
+            ''', (FAILED, 'Interrupted; not retried because it may have completed',
+                  RUNNING, cutoff)).rowcount
+        if requeued:
+            print(f"⚠ Re-queued {requeued} interrupted job(s)")
+        if failed:
+            print(f"⚠ Marked {failed} interrupted job(s) failed")
+
+    def _claim_next(self):
+        """Atomically move the oldest queued job to 'running' and return (id, kind, payload)"""
+        with self.db.transaction() as conn:
+            row = conn.execute('''
+                SELECT id, kind, payload FROM jobs
+                WHERE status = ? ORDER BY id LIMIT 1
+            ''', (QUEUED,)).fetchone()
+            if not row:
+                return None
+            conn.execute('''
+                UPDATE jobs SET status = ?, started_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (RUNNING, row[0]))
+            return row
+
+    def _finish(self, job_id: int, status: str, result: dict = None, error: str = None):
+        self.db.execute('''
+            UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (status, json.dumps(result) if result is not None else None, error, job_id))
+
+    def _worker_loop(self):
+        while self.running:
+            try:
+                job = self._claim_next()
+            except Exception as e:
+                print(f"❌ Job queue error: {e}")
+                time.sleep(self.poll_seconds)
+                continue
+
+            if job is None:
+                with self._cond:
+                    self._cond.wait(self.poll_seconds)
+                continue
+
+            job_id, kind, payload = job
+            try:
+                result = self.handlers[kind](json.loads(payload))
+                self._finish(job_id, SUCCEEDED, result)
+            except Exception as e:
+                print(f"❌ Job #{job_id} ({kind}) failed: {e}")
+                self._finish(job_id, FAILED, error=str(e))
@@ -0,0 +1,260 @@
+"""
+X Bot Limiter - Token-bucket rate limits with persisted state
+Named limits (global, per-author, per-endpoint) checked before the bot calls
+the API, so it stays under X's limits instead of sleeping inside tweepy,
+plus a registry of the limits X reports in x-rate-limit-* response headers
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to capacity tokens, refilled continuously"""
+
+    __slots__ = ('capacity', 'period', 'tokens', 'updated_at')
+
+    def __init__(self, capacity: float, period: float, tokens: float = None,
+                 updated_at: float = None):
+        """
+        Args:
+            capacity: Maximum burst size
+            period: Seconds to refill a full bucket
+            tokens: Current token count (defaults to full)
+            updated_at: Timestamp of the token count (defaults to now)
+        """
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity if tokens is None else tokens
+        self.updated_at = time.time() if updated_at is None else updated_at
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second"""
+        return self.capacity / self.period if self.period > 0 else float('inf')
+
+    def refill(self, now: float = None):
+        now = time.time() if now is None else now
+        elapsed = max(now - self.updated_at, 0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def available(self, now: float = None) -> float:
+        self.refill(now)
+        return self.tokens
+
+    def wait_time(self, cost: float = 1, now: float = None) -> float:
+        """Seconds until cost tokens are available"""
+        self.refill(now)
+        missing = cost - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float('inf')
+
+    def consume(self, cost: float = 1, now: float = None) -> bool:
+        self.refill(now)
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+
+class RateLimiter:
+    """
+    Registry of named token-bucket limits
+
+    Each limit has one bucket per key (use '' for a global limit, an author ID
+    for per-author cooldowns, ...). Bucket state is written to the
+    rate_limit_state table after every change so limits survive restarts.
+    """
+
+    def __init__(self, db=None):
+        """
+        Args:
+            db: Optional ConnectionPool; without it state is kept in memory only
+        """
+        self.db = db
+        self._limits = {}
+        self._buckets = {}
+        self._lock = threading.RLock()
+
+    def configure(self, name: str, capacity: float, period: float):
+        """Create or resize a limit: capacity requests per period seconds"""
+        with self._lock:
+            if self._limits.get(name) == (capacity, period):
+                return
+            self._limits[name] = (capacity, period)
+            for (limit_name, _), bucket in self._buckets.items():
+                if limit_name == name:
+                    bucket.refill()
+                    bucket.capacity = capacity
+                    bucket.period = period
+                    bucket.tokens = min(bucket.tokens, capacity)
+
+    def _bucket(self, name: str, key: str) -> TokenBucket:
+        bucket = self._buckets.get((name, key))
+        if bucket is None:
+            capacity, period = self._limits[name]
+            bucket = TokenBucket(capacity, period)
+            if self.db is not None:
+                row = self.db.fetchone('''
+                    SELECT tokens, updated_at FROM rate_limit_state
+                    WHERE name = ? AND key = ?
+                ''', (name, key))
+                if row:
+                    bucket.tokens = min(row[0], capacity)
+                    bucket.updated_at = row[1]
+            self._buckets[(name, key)] = bucket
+        return bucket
+
+    def _save(self, name: str, key: str, bucket: TokenBucket):
+        if self.db is None:
+            return
+        if bucket.tokens >= bucket.capacity:
+            # A full bucket is the default state; no need to keep a row
+            self.db.execute('DELETE FROM rate_limit_state WHERE name = ? AND key = ?', (name, key))
+            return
+        self.db.execute('''
+            INSERT INTO rate_limit_state (name, key, tokens, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name, key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+        ''', (name, key, bucket.tokens, bucket.updated_at))
+
+    def available(self, name: str, key: str = '') -> int:
+        """Whole requests that can be made right now"""
+        with self._lock:
+            return int(self._bucket(name, str(key)).available())
+
+    def retry_after(self, name: str, key: str = '', cost: float = 1) -> float:
+        """Seconds until the next request under this limit is allowed"""
+        with self._lock:
+            return self._bucket(name, str(key)).wait_time(cost)
+
+    def try_acquire(self, name: str, key: str = '', cost: float = 1) -> bool:
+        """Take cost tokens from one limit if they are available"""
+        return self.try_acquire_all([(name, key)], cost)
+
+    def try_acquire_all(self, limits: Iterable[Tuple[str, str]], cost: float = 1) -> bool:
+        """
+        Take cost tokens from every (name, key) limit, or from none of them
+
+        Returns:
+            True if all limits had capacity and were charged
+        """
+        with self._lock:
+            now = time.time()
+            buckets = [(name, str(key), self._bucket(name, str(key))) for name, key in limits]
+            if any(bucket.wait_time(cost, now) > 0 for _, _, bucket in buckets):
+                return False
+            for name, key, bucket in buckets:
+                bucket.consume(cost, now)
+                self._save(name, key, bucket)
+            return True
+
+    def blocking_limit(self, limits: Iterable[Tuple[str, str]]) -> Optional[Tuple[str, float]]:
+        """Return (name, seconds) for the limit that blocks the longest, or None"""
+        with self._lock:
+            worst = None
+            for name, key in limits:
+                wait = self._bucket(name, str(key)).wait_time()
+                if wait > 0 and (worst is None or wait > worst[1]):
+                    worst = (name, wait)
+            return worst
+
+    def prune(self):
+        """Forget buckets that have refilled completely, in memory and on disk"""
+        with self._lock:
+            now = time.time()
+            for bucket_key, bucket in list(self._buckets.items()):
+                if bucket.available(now) >= bucket.capacity:
+                    del self._buckets[bucket_key]
+            if self.db is None:
+                return
+            for name, (capacity, period) in self._limits.items():
+                self.db.execute('''
+                    DELETE FROM rate_limit_state WHERE name = ? AND updated_at <= ?
+                ''', (name, now - period))
+
+
+class RateLimitRegistry:
+    """
+    Endpoint rate limits as reported by X
+
+    Fed by the x-rate-limit-limit / -remaining / -reset headers of every
+    response (see hook) and keyed by (auth context, endpoint), where the auth
+    context is 'user' for OAuth 1.0a requests and 'app' for bearer-token
+    requests. Callers plan around a limit with remaining() and
+    next_available() instead of letting tweepy sleep until the window resets.
+    """
+
+    def __init__(self):
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint(method: str, url: str) -> str:
+        """Normalized endpoint name, e.g. 'GET /2/users/:id/mentions'"""
+        version, _, rest = urlsplit(str(url)).path.lstrip('/').partition('/')
+        # Numeric path segments after the API version are resource IDs
+        rest = '/'.join(':id' if part.isdigit() else part for part in rest.split('/'))
+        return f"{method.upper()} /{version}/{rest}"
+
+    @staticmethod
+    def auth_context(authorization: str) -> str:
+        return 'app' if (authorization or '').startswith('Bearer') else 'user'
+
+    def record(self, method: str, url: str, headers, authorization: str = ''):
+        """Store the limit headers of one response (ignored if absent)"""
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        if remaining is None or reset is None:
+            return
+        limit = headers.get('x-rate-limit-limit')
+        key = (self.auth_context(authorization), self.endpoint(method, url))
+        with self._lock:
+            self._limits[key] = (
+                int(limit) if limit is not None else None, int(remaining), float(reset)
+            )
+
+    def hook(self, response, *args, **kwargs):
+        """requests response hook; register on every session that talks to X"""
+        request = response.request
+        self.record(request.method, response.url, response.headers,
+                    request.headers.get('Authorization', ''))
+
+    def status(self, endpoint: str, auth: str = 'user',
+               now: float = None) -> Optional[Tuple[Optional[int], int, float]]:
+        """(limit, remaining, reset_at) for an endpoint, or None if never seen"""
+        now = time.time() if now is None else now
+        with self._lock:
+            status = self._limits.get((auth, endpoint))
+        if status is None:
+            return None
+        limit, remaining, reset_at = status
+        if reset_at <= now and limit is not None:
+            # The window has rolled over since the last response
+            return limit, limit, reset_at
+        return status
+
+    def remaining(self, endpoint: str, auth: str = 'user') -> Optional[int]:
+        """Requests left in the current window, or None if unknown"""
+        status = self.status(endpoint, auth)
+        return None if status is None else status[1]
+
+    def next_available(self, endpoint: str, auth: str = 'user', now: float = None) -> float:
+        """Timestamp at which the next request to the endpoint is allowed"""
+        now = time.time() if now is None else now
+        status = self.status(endpoint, auth, now)
+        if status is None or status[1] > 0:
+            return now
+        return max(status[2], now)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Every known limit, keyed by 'auth endpoint'"""
+        with self._lock:
+            items = list(self._limits.items())
+        return {
+            f"{auth} {endpoint}": {'limit': limit, 'remaining': remaining, 'reset': reset}
+            for (auth, endpoint), (limit, remaining, reset) in items
+        }
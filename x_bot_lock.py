@@ -0,0 +1,84 @@
+"""
+X Bot Lock - Cross-process leader election with an advisory file lock
+Lets exactly one of several web worker processes run the tweet scheduler,
+and hands the role to another process if the leader exits
+"""
+
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no flock; every process acts as leader (single-process use)
+    fcntl = None
+
+
+class LeaderLock:
+    """
+    Non-blocking exclusive lock on a file
+
+    The OS releases the lock when the holding process exits, even on a
+    crash, so a waiting process can take over without stale-lock cleanup.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Lock file shared by every process that competes for the role
+        """
+        self.path = path
+        self._fd = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if no other process holds it"""
+        with self._lock:
+            if self._fd is not None:
+                return True
+            if fcntl is None:
+                self._fd = -1
+                return True
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            self._fd = fd
+            return True
+
+    def release(self):
+        """Give up the lock and stop any pending run_when_acquired() wait"""
+        self._stop.set()
+        with self._lock:
+            fd, self._fd = self._fd, None
+        if fd is not None and fd >= 0:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def run_when_acquired(self, callback, retry_seconds: float = 15.0):
+        """
+        Call callback once this process holds the lock
+
+        Runs it immediately if the lock is free, otherwise retries from a
+        daemon thread every retry_seconds until the current leader exits.
+        """
+        if self.try_acquire():
+            callback()
+            return
+
+        def wait_for_lock():
+            while not self._stop.wait(retry_seconds):
+                if self.try_acquire():
+                    callback()
+                    return
+
+        threading.Thread(target=wait_for_lock, name="leader-wait", daemon=True).start()
@@ -0,0 +1,341 @@
+"""
+X Bot Media - Media upload helpers shared by XBot and XBotEnhanced
+Uploads a tweet's images concurrently on one process-wide executor, reuses
+media IDs of byte-identical files while X still accepts them, and streams
+large files, GIFs and videos through the resumable chunked upload endpoints
+
+Media can be given as a file path, a (filename, file-like or bytes) pair, or
+a file-like object with a name, so request bodies can be uploaded without a
+temp-file round trip.
+"""
+
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from typing import List
+
+import tweepy
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Four images per tweet, a few posts in flight at once
+UPLOAD_WORKERS = 8
+
+# X keeps uploaded media for 24 hours unless the upload response says otherwise
+DEFAULT_MEDIA_TTL = 24 * 60 * 60
+
+# Files above this size (and every GIF/video) use the chunked upload endpoints
+SIMPLE_UPLOAD_LIMIT = 5 * 1024 * 1024
+
+# APPEND segment size; X accepts up to 5 MB per segment
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Attempts per chunked-upload command before giving up
+CHUNK_RETRIES = 5
+
+
+class MediaUploadError(Exception):
+    """Raised when one or more media uploads for a tweet failed"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        details = ", ".join(f"{path}: {error}" for path, error in failures)
+        super().__init__(f"{len(failures)} media upload(s) failed ({details})")
+
+
+def media_name(media) -> str:
+    """Display/file name of a media item"""
+    if isinstance(media, str):
+        return os.path.basename(media)
+    if isinstance(media, tuple):
+        return os.path.basename(media[0])
+    name = getattr(media, 'filename', None) or getattr(media, 'name', None)
+    return os.path.basename(name) if isinstance(name, str) else 'upload'
+
+
+@contextmanager
+def open_media(media):
+    """
+    Yield a binary file object for a media item, positioned at the start
+
+    Paths are opened and closed here; caller-owned file objects are rewound
+    but left open.
+    """
+    if isinstance(media, str):
+        with open(media, 'rb') as f:
+            yield f
+        return
+    if isinstance(media, tuple):
+        media = media[1]
+    if isinstance(media, (bytes, bytearray, memoryview)):
+        yield BytesIO(media)
+        return
+    media.seek(0)
+    yield media
+
+
+def media_size(media) -> int:
+    """Size in bytes of a media item"""
+    if isinstance(media, str):
+        return os.path.getsize(media)
+    with open_media(media) as f:
+        return f.seek(0, os.SEEK_END)
+
+
+def file_digest(media) -> str:
+    """SHA-256 of a media item's contents, read in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open_media(media) as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MediaCache:
+    """
+    Content-addressed cache of uploaded media IDs
+
+    Maps the SHA-256 of a file to the media_id X returned for it, together
+    with the expiry X reported. Entries are only handed out while they have
+    at least safety_margin seconds left, so a post never races the expiry.
+    """
+
+    def __init__(self, db, safety_margin: float = 10 * 60):
+        """
+        Args:
+            db: ConnectionPool with the media_cache table
+            safety_margin: Seconds before expiry at which an entry stops being used
+        """
+        self.db = db
+        self.safety_margin = safety_margin
+
+    def get(self, digest: str):
+        """Return a still-valid media ID for the digest, or None"""
+        row = self.db.fetchone('''
+            SELECT media_id FROM media_cache
+            WHERE digest = ? AND expires_at > ?
+        ''', (digest, time.time() + self.safety_margin))
+        return int(row[0]) if row else None
+
+    def put(self, digest: str, media_id, expires_after_secs: float = None):
+        """Remember the media ID returned for an upload"""
+        ttl = expires_after_secs or DEFAULT_MEDIA_TTL
+        now = time.time()
+        self.db.execute('''
+            INSERT INTO media_cache (digest, media_id, uploaded_at, expires_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(digest) DO UPDATE SET media_id = excluded.media_id,
+                uploaded_at = excluded.uploaded_at, expires_at = excluded.expires_at
+        ''', (digest, str(media_id), now, now + ttl))
+
+    def expiry(self, media_ids):
+        """Earliest expiry timestamp among cached media IDs, or None if any is unknown"""
+        expiries = []
+        for media_id in media_ids:
+            row = self.db.fetchone(
+                'SELECT MAX(expires_at) FROM media_cache WHERE media_id = ?', (str(media_id),)
+            )
+            if not row or row[0] is None:
+                return None
+            expiries.append(row[0])
+        return min(expiries) if expiries else None
+
+    def forget(self, media_ids):
+        """Drop entries for media IDs that X rejected"""
+        for media_id in media_ids:
+            self.db.execute('DELETE FROM media_cache WHERE media_id = ?', (str(media_id),))
+
+    def prune(self):
+        """Delete expired entries"""
+        self.db.execute('DELETE FROM media_cache WHERE expires_at <= ?', (time.time(),))
+
+
+def _media_type(media) -> str:
+    return mimetypes.guess_type(media_name(media))[0] or 'application/octet-stream'
+
+
+def _media_category(media_type: str) -> str:
+    if media_type == 'image/gif':
+        return 'tweet_gif'
+    if media_type.startswith('video/'):
+        return 'tweet_video'
+    return 'tweet_image'
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Network failures and 5xx responses are worth retrying; other API errors are not"""
+    if isinstance(error, tweepy.TwitterServerError):
+        return True
+    return isinstance(error, tweepy.TweepyException) and not isinstance(error, tweepy.HTTPException)
+
+
+def _with_retries(command, description: str, retries: int = CHUNK_RETRIES):
+    """Run one chunked-upload command, retrying transient failures with backoff"""
+    for attempt in range(1, retries + 1):
+        try:
+            return command()
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            delay = min(2 ** attempt, 30)
+            print(f"⚠ {description} failed ({e}); retrying in {delay}s")
+            time.sleep(delay)
+
+
+def needs_chunked_upload(media_file) -> bool:
+    """GIFs, videos and files over the simple-upload limit go through chunked upload"""
+    media_type = _media_type(media_file)
+    if media_type == 'image/gif' or media_type.startswith('video/'):
+        return True
+    return media_size(media_file) > SIMPLE_UPLOAD_LIMIT
+
+
+def chunked_upload(api, media_file, media_category: str = None,
+                   chunk_size: int = CHUNK_SIZE):
+    """
+    Upload a file with INIT / APPEND / FINALIZE, then poll STATUS until ready
+
+    The file is streamed from disk one segment at a time, so memory use is
+    bounded by chunk_size. A failed APPEND is retried from the same segment:
+    segments X already acknowledged are never sent again.
+
+    Args:
+        api: Authenticated tweepy.API (v1.1) instance
+        media_file: Path or file-like media item to upload
+        media_category: tweet_image / tweet_gif / tweet_video (guessed if omitted)
+        chunk_size: Bytes per APPEND segment
+
+    Returns:
+        tweepy Media model for the processed upload
+    """
+    total_bytes = media_size(media_file)
+    media_type = _media_type(media_file)
+    media_category = media_category or _media_category(media_type)
+    name = media_name(media_file)
+
+    media_id = _with_retries(
+        lambda: api.chunked_upload_init(total_bytes, media_type, media_category=media_category),
+        f"INIT {name}"
+    ).media_id
+
+    with open_media(media_file) as f:
+        segment_index = 0
+        while segment_index * chunk_size < total_bytes:
+            offset = segment_index * chunk_size
+
+            def append():
+                # Re-read from the segment's offset on every attempt
+                f.seek(offset)
+                return api.chunked_upload_append(media_id, (name, f.read(chunk_size)), segment_index)
+
+            _with_retries(append, f"APPEND {name} segment {segment_index}")
+            segment_index += 1
+
+    media = _with_retries(lambda: api.chunked_upload_finalize(media_id), f"FINALIZE {name}")
+
+    # Videos and GIFs are processed asynchronously after FINALIZE
+    info = getattr(media, 'processing_info', None)
+    while info and info.get('state') in ('pending', 'in_progress'):
+        time.sleep(info.get('check_after_secs', 1))
+        media = _with_retries(lambda: api.get_media_upload_status(media_id), f"STATUS {name}")
+        info = getattr(media, 'processing_info', None)
+
+    if info and info.get('state') == 'failed':
+        error = info.get('error', {}).get('message', 'processing failed')
+        raise tweepy.TweepyException(f"Media processing failed for {name}: {error}")
+
+    return media
+
+
+def upload_media(api, media_file, cache: MediaCache = None):
+    """
+    Upload one file, or reuse the cached media ID of identical content
+
+    Returns:
+        (media_id, reused) - reused is True when the ID came from the cache
+    """
+    digest = None
+    if cache is not None:
+        digest = file_digest(media_file)
+        media_id = cache.get(digest)
+        if media_id is not None:
+            return media_id, True
+
+    if needs_chunked_upload(media_file):
+        media = chunked_upload(api, media_file)
+    elif isinstance(media_file, str):
+        media = api.media_upload(media_file)
+    else:
+        with open_media(media_file) as f:
+            media = api.media_upload(media_name(media_file), file=f)
+    if cache is not None:
+        cache.put(digest, media.media_id, getattr(media, 'expires_after_secs', None))
+    return media.media_id, False
+
+
+def get_upload_executor() -> ThreadPoolExecutor:
+    """Return the shared upload executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=UPLOAD_WORKERS,
+                    thread_name_prefix="media-upload"
+                )
+    return _executor
+
+
+def upload_media_files(api, media_files: List, cache: MediaCache = None,
+                       reused_ids: List[int] = None) -> List[int]:
+    """
+    Upload media files concurrently
+
+    Missing files are skipped with a warning, as before. Every started upload
+    is awaited even if one fails, so no upload is left running in the
+    background.
+
+    Args:
+        api: Authenticated tweepy.API (v1.1) instance
+        media_files: Paths or file-like media items to upload
+        cache: Optional MediaCache; identical files reuse a still-valid media ID
+        reused_ids: Optional list that receives the IDs taken from the cache
+
+    Returns:
+        Media IDs in the same order as media_files
+
+    Raises:
+        MediaUploadError: If any existing file failed to upload
+    """
+    executor = get_upload_executor()
+    uploads = []
+    for media_file in media_files:
+        if not isinstance(media_file, str) or os.path.exists(media_file):
+            uploads.append((media_file, executor.submit(upload_media, api, media_file, cache)))
+        else:
+            print(f"⚠ Media file not found: {media_file}")
+
+    media_ids = []
+    failures = []
+    for media_file, future in uploads:
+        try:
+            media_id, reused = future.result()
+        except Exception as e:
+            failures.append((media_name(media_file), e))
+            continue
+        media_ids.append(media_id)
+        if reused:
+            if reused_ids is not None:
+                reused_ids.append(media_id)
+            print(f"✓ Reused uploaded media: {media_name(media_file)}")
+        else:
+            print(f"✓ Uploaded media: {media_name(media_file)}")
+
+    if failures:
+        raise MediaUploadError(failures)
+    return media_ids
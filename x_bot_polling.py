@@ -0,0 +1,70 @@
+"""
+X Bot Polling - Adaptive poll interval for the mention monitor
+Polls faster while mentions are arriving in full pages, backs off while the
+account is quiet, and never outpaces the endpoint's remaining rate budget
+"""
+
+import time
+
+
+class AdaptivePoller:
+    """Computes the delay before the next poll from recent results and rate-limit headers"""
+
+    def __init__(self, base_interval: float = 120, min_interval: float = 15,
+                 max_interval: float = 900, backoff: float = 2.0):
+        """
+        Args:
+            base_interval: Starting delay in seconds
+            min_interval: Shortest delay used during bursts
+            max_interval: Longest delay used while idle
+            backoff: Multiplier applied after each empty poll
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+        self.interval = base_interval
+        self.requests_per_poll = 1
+        self.remaining = None
+        self.reset_at = None
+
+    def record_poll(self, item_count: int, requests: int = 1, page_size: int = 100):
+        """
+        Adjust the interval after a poll
+
+        Args:
+            item_count: Number of new items the poll returned
+            requests: Number of API requests (pages) the poll used
+            page_size: Page size requested
+        """
+        self.requests_per_poll = max(requests, 1)
+        if requests > 1 or item_count >= page_size:
+            # Pages are filling up: poll twice as often
+            self.interval = max(self.interval / 2, self.min_interval)
+        elif item_count == 0:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        else:
+            # Some traffic: drift back towards the base interval
+            self.interval = min(max(self.interval, self.min_interval), self.base_interval)
+
+    def update_rate_limit(self, remaining: int, reset_at: float):
+        """Record the x-rate-limit-remaining / x-rate-limit-reset values of the endpoint"""
+        self.remaining = remaining
+        self.reset_at = reset_at
+
+    def next_interval(self, now: float = None) -> float:
+        """Seconds to wait before the next poll"""
+        now = time.time() if now is None else now
+        interval = self.interval
+
+        if self.remaining is not None and self.reset_at is not None and self.reset_at > now:
+            window = self.reset_at - now
+            polls_left = self.remaining / self.requests_per_poll
+            if polls_left < 1:
+                # Budget spent: wait for the window to reset
+                return max(window + 1, interval)
+            # Spread the remaining budget evenly over the rest of the window
+            interval = max(interval, window / polls_left)
+
+        return interval
@@ -0,0 +1,213 @@
+"""
+X Bot Rules - Auto-reply rule storage and compiled keyword matching
+Builds an Aho-Corasick automaton over every rule keyword so each mention is
+scanned once, whatever the number of rules
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive multi-keyword matcher with rule priority
+
+    Rules are given in priority order (first = highest). When several keywords
+    occur in a text, the response of the highest-priority rule wins, matching
+    the old behaviour of returning the first rule whose keyword is present.
+    """
+
+    def __init__(self, rules: Iterable[Tuple]):
+        """
+        Args:
+            rules: (keyword, response) or (keyword, response, whole_word) tuples,
+                highest priority first. whole_word rules only match when the
+                keyword is not part of a longer word.
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._responses = []
+
+        for rank, rule in enumerate(rules):
+            keyword, response = rule[0], rule[1]
+            whole_word = bool(rule[2]) if len(rule) > 2 else False
+            self._responses.append(response)
+            self._add(keyword.lower(), rank, whole_word)
+
+        self._build_failure_links()
+
+    def __len__(self):
+        return len(self._responses)
+
+    def _add(self, keyword: str, rank: int, whole_word: bool):
+        if not keyword:
+            return
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+
+        # Boundaries only apply where the keyword itself starts/ends on a word char
+        need_left = whole_word and _is_word_char(keyword[0])
+        need_right = whole_word and _is_word_char(keyword[-1])
+        self._out[state].append((rank, len(keyword), need_left, need_right))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+        # Check higher-priority outputs first at each position
+        for outputs in self._out:
+            outputs.sort()
+
+    def match(self, text: str) -> Optional[int]:
+        """Return the rank of the highest-priority rule matching text, or None"""
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        best = None
+        state = 0
+
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for rank, length, need_left, need_right in out[state]:
+                if best is not None and rank >= best:
+                    break
+                start = end - length + 1
+                if need_left and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if need_right and end + 1 < len(text) and _is_word_char(text[end + 1]):
+                    continue
+                best = rank
+                break
+
+            if best == 0:
+                break
+
+        return best
+
+    def find_response(self, text: str) -> Optional[str]:
+        """Return the response of the best matching rule, or None"""
+        rank = self.match(text)
+        return None if rank is None else self._responses[rank]
+
+
+class RuleStore:
+    """
+    Single source of auto-reply rules, cached in memory
+
+    Rules live in the auto_reply_rules table. Reads are served from a cached
+    copy and a compiled KeywordMatcher that are rebuilt only when the version
+    counter moves, which happens on every write made through this store. The
+    counter is mirrored in bot_state['rules_version'], so writes made by
+    other processes sharing the database invalidate this cache too; that
+    shared counter is read at most every shared_check_seconds, so the hot
+    path normally does no database reads.
+    """
+
+    def __init__(self, db, shared_check_seconds: float = 30.0):
+        """
+        Args:
+            db: ConnectionPool for the bot database
+            shared_check_seconds: How often to look for writes by other processes
+        """
+        self.db = db
+        self.shared_check_seconds = shared_check_seconds
+        self._lock = threading.Lock()
+        self._version = 0
+        self._shared_seen = 0
+        self._shared_checked_at = None
+        self._loaded_version = None
+        self._rules = []
+        self._matcher = KeywordMatcher([])
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        """Mark the cache stale here and in every process sharing the database"""
+        self.db.execute('''
+            INSERT INTO bot_state (key, value) VALUES ('rules_version', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1,
+                updated_at = CURRENT_TIMESTAMP
+        ''')
+        with self._lock:
+            self._version += 1
+
+    def _shared_version(self) -> int:
+        row = self.db.fetchone("SELECT value FROM bot_state WHERE key = 'rules_version'")
+        return int(row[0]) if row and row[0] else 0
+
+    def _refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._shared_checked_at is None or \
+                    now - self._shared_checked_at >= self.shared_check_seconds:
+                self._shared_seen = self._shared_version()
+                self._shared_checked_at = now
+            version = (self._version, self._shared_seen)
+            if self._loaded_version == version:
+                return
+            rules = self.db.fetchall('''
+                SELECT keyword, response, whole_word FROM auto_reply_rules
+                WHERE enabled = 1
+                ORDER BY priority DESC, id ASC
+            ''')
+            self._rules = rules
+            self._matcher = KeywordMatcher(rules)
+            self._loaded_version = version
+
+    def rules(self) -> List[Tuple]:
+        """Enabled rules as (keyword, response, whole_word), highest priority first"""
+        self._refresh()
+        return self._rules
+
+    def matcher(self) -> KeywordMatcher:
+        """Compiled matcher for the current rules"""
+        self._refresh()
+        return self._matcher
+
+    def add(self, keyword: str, response: str, priority: int = 0,
+            whole_word: bool = False, source: str = 'manual'):
+        """Insert a rule"""
+        self.db.execute('''
+            INSERT INTO auto_reply_rules (keyword, response, priority, whole_word, source)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (keyword, response, priority, whole_word, source))
+        self.invalidate()
+
+    def replace_source(self, source: str, rules: Iterable[Tuple[str, str]]):
+        """Atomically replace every rule owned by source with (keyword, response) pairs"""
+        with self.db.transaction() as conn:
+            conn.execute('DELETE FROM auto_reply_rules WHERE source = ?', (source,))
+            conn.executemany('''
+                INSERT INTO auto_reply_rules (keyword, response, source)
+                VALUES (?, ?, ?)
+            ''', [(keyword, response, source) for keyword, response in rules])
+        self.invalidate()
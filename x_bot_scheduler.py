@@ -0,0 +1,114 @@
+"""
+X Bot Scheduler - In-memory due-time queue for scheduled tweets
+A min-heap of deadlines guarded by a condition variable, so the scheduler
+thread sleeps exactly until the next tweet is due
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Hashable, List, Optional
+
+
+class DueQueue:
+    """
+    Min-heap of (due_timestamp, key) entries
+
+    Keys are tweet IDs, or any other hashable job key such as
+    ('media', tweet_id). Cancelling or rescheduling a key marks its old heap
+    entry stale instead of searching the heap for it; stale entries are dropped
+    when they reach the top. Every mutation notifies the condition so a
+    waiting scheduler re-computes its deadline.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._woken = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._due)
+
+    def load(self, entries):
+        """Replace the queue contents with (key, due_timestamp) pairs"""
+        with self._cond:
+            self._due = {key: due for key, due in entries}
+            self._heap = [(due, next(self._seq), key) for key, due in self._due.items()]
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def push(self, key: Hashable, due: float):
+        """Add or reschedule a key"""
+        with self._cond:
+            self._due[key] = due
+            heapq.heappush(self._heap, (due, next(self._seq), key))
+            self._cond.notify_all()
+
+    def remove(self, key: Hashable):
+        """Forget a key; its heap entry is discarded lazily"""
+        with self._cond:
+            if self._due.pop(key, None) is not None:
+                self._cond.notify_all()
+
+    def wake(self):
+        """Make a blocked wait() return immediately"""
+        with self._cond:
+            self._woken = True
+            self._cond.notify_all()
+
+    def _drop_stale(self):
+        while self._heap:
+            due, _, key = self._heap[0]
+            if self._due.get(key) == due:
+                return
+            heapq.heappop(self._heap)
+
+    def next_due(self) -> Optional[float]:
+        """Timestamp of the earliest queued key, or None if empty"""
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float = None) -> List[Hashable]:
+        """Remove and return every key due at or before now"""
+        now = time.time() if now is None else now
+        due_keys = []
+        with self._cond:
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, key = heapq.heappop(self._heap)
+                del self._due[key]
+                due_keys.append(key)
+                self._drop_stale()
+        return due_keys
+
+    def wait(self, max_wait: float = None) -> List[Hashable]:
+        """
+        Block until at least one key is due and return the due keys
+
+        Returns an empty list early if wake() is called or max_wait elapses.
+        """
+        deadline = None if max_wait is None else time.time() + max_wait
+        with self._cond:
+            while True:
+                due_keys = self.pop_due()
+                if due_keys:
+                    return due_keys
+                if self._woken:
+                    self._woken = False
+                    return []
+
+                now = time.time()
+                timeout = None
+                if self._heap:
+                    timeout = max(self._heap[0][0] - now, 0)
+                if deadline is not None:
+                    if now >= deadline:
+                        return []
+                    remaining = deadline - now
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                self._cond.wait(timeout)
@@ -0,0 +1,63 @@
+"""
+X Bot Startup - Once-only bot initialization for the web and desktop apps
+Builds the bot on a background thread at process start, so authentication
+is done before the first request arrives, and never builds it twice
+"""
+
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+
+class BotInitializer:
+    """
+    Thread-safe, once-only bot construction
+
+    get() returns the same (bot, authenticated) pair to every caller. The
+    first caller builds it while holding a lock; concurrent callers wait for
+    that build instead of starting their own. If the factory raises, the
+    next get() tries again.
+    """
+
+    def __init__(self, factory: Callable[[], Tuple[Any, bool]]):
+        """
+        Args:
+            factory: Function that builds the bot and returns (bot, authenticated).
+                It runs at most once successfully per process. It is called
+                again after raising, so it must stop anything it started first.
+        """
+        self.factory = factory
+        self.bot = None
+        self.authenticated = False
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def get(self) -> Tuple[Any, bool]:
+        """Return (bot, authenticated), building the bot on first use"""
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    try:
+                        self.bot, self.authenticated = self.factory()
+                        self._ready = True
+                    except Exception as e:
+                        print(f"Bot init: {e}")
+        return self.bot, self.authenticated
+
+    def warm_up(self, on_ready: Optional[Callable[[Any], None]] = None) -> threading.Thread:
+        """
+        Build the bot on a daemon thread
+
+        Args:
+            on_ready: Called with the bot once it is built and authenticated
+
+        Returns:
+            The warm-up thread
+        """
+        def run():
+            bot, authenticated = self.get()
+            if on_ready and bot and authenticated:
+                on_ready(bot)
+
+        thread = threading.Thread(target=run, name="bot-warmup", daemon=True)
+        thread.start()
+        return thread
@@ -6,27 +6,25 @@ Opens in your browser - no tkinter issues!
 
 from flask import Flask, render_template_string, request, jsonify
 from x_bot import XBot
+from x_bot_startup import BotInitializer
 import threading
 import webbrowser
 import os
 from datetime import datetime
 
 app = Flask(__name__)
-bot = None
-authenticated = False
+
+def create_bot():
+    """Build the bot (runs once per process)"""
+    bot = XBot()
+    return bot, bool(bot.client)
+
+# Built in the background while the server starts, never on a request
+bot_initializer = BotInitializer(create_bot)
 
 def lazy_init_bot():
-    """Initialize bot only when needed - avoids rate limit at startup"""
-    global bot, authenticated
-    if bot is None:
-        try:
-            bot = XBot()
-            if bot.client:
-                authenticated = True
-        except Exception as e:
-            print(f"Bot init: {e}")
-            authenticated = False
-    return bot, authenticated
+    """Return (bot, authenticated); waits for the warm-up if it is still running"""
+    return bot_initializer.get()
 
 # HTML Template - Beautiful, modern design
 HTML_TEMPLATE = '''
@@ -607,6 +605,9 @@ if __name__ == '__main__':
     print("\n✨ Opening in your browser at: http://127.0.0.1:5000")
     print("\n💡 Press Ctrl+C to stop the server\n")
     
+    # Authenticate while the server starts
+    bot_initializer.warm_up()
+    
     # Run Flask app
     app.run(debug=False, port=5000)
 
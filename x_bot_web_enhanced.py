@@ -2,11 +2,20 @@
 """
 X Bot Enhanced Web GUI - Full-Featured with Scheduling and Auto-Reply
 Beautiful dark glass UI with tabs for all features
+
+Local: python x_bot_web_enhanced.py (Flask development server)
+Production: gunicorn x_bot_web_enhanced:app (settings in gunicorn.conf.py)
 """
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, render_template_string, request, jsonify
 from x_bot_enhanced import XBotEnhanced
+from x_bot_http import close_shared_transport
+from x_bot_images import ImagePreprocessor, shutdown_preprocess_executor
+from x_bot_jobs import JobQueue
+from x_bot_lock import LeaderLock
+from x_bot_startup import BotInitializer
 import threading
+import tempfile
 import webbrowser
 import os
 from datetime import datetime
@@ -15,23 +24,138 @@ import json
 app = Flask(__name__)
 
 bot = None
-authenticated = False
+job_queue = None
+scheduler_lock = None
+leader_stop = threading.Event()
+autoreply_lock = threading.Lock()
 
-def lazy_init_bot():
-    """Initialize bot only when needed"""
-    global bot, authenticated
-    if bot is None:
+# How often the leader applies auto-reply settings saved by other workers
+AUTOREPLY_SETTINGS_POLL_SECONDS = 5
+
+# /get-scheduled page sizes
+SCHEDULED_PAGE_SIZE = 50
+MAX_SCHEDULED_PAGE_SIZE = 200
+
+# Each open /events stream holds a request thread for as long as the page is
+# open, so cap them per process and leave the other threads for requests
+MAX_EVENT_STREAMS = int(os.environ.get('WEB_EVENT_STREAMS', '4'))
+EVENT_STREAM_RETRY_SECONDS = 30
+event_stream_slots = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+
+# Optimized copies of uploaded images, keyed by content hash
+image_preprocessor = ImagePreprocessor(os.path.join(tempfile.gettempdir(), 'x_bot_images'))
+
+def create_bot():
+    """
+    Build the bot and start its background workers (runs once per process)
+    
+    If starting the workers fails, whatever did start is stopped again before
+    the error propagates, so the retry in bot_initializer.get() cannot leave
+    a second scheduler running.
+    """
+    global bot, job_queue, scheduler_lock
+    bot = XBotEnhanced()
+    if not bot.client:
+        return bot, False
+    # Posting and scheduling run on background workers
+    job_queue = JobQueue(bot.db, {'post': run_post_job, 'schedule': run_schedule_job})
+    # Start scheduler and auto-reply automatically, in one worker process
+    # only; another worker takes over if that one exits
+    scheduler_lock = LeaderLock(
+        os.environ.get('SCHEDULER_LOCK_FILE', bot.db_file + '.scheduler.lock')
+    )
+    try:
+        job_queue.start()
+        # Last, so nothing can fail after the scheduler is running
+        scheduler_lock.run_when_acquired(start_leader_tasks)
+    except Exception:
+        stop_bot_workers()
+        bot.db.close()
+        bot = job_queue = scheduler_lock = None
+        raise
+    return bot, True
+
+def start_leader_tasks():
+    """Run the scheduler and the auto-reply monitor in the lock holder"""
+    bot.start_scheduler()
+    threading.Thread(target=watch_autoreply_settings, name="autoreply-settings", daemon=True).start()
+
+def apply_autoreply_settings(settings):
+    """Start or stop the auto-reply monitor to match the saved settings"""
+    with autoreply_lock:
+        bot.auto_reply_config['enabled'] = settings['enabled']
+        bot.auto_reply_config['max_replies_per_hour'] = settings['max_replies_per_hour']
+        bot.auto_reply_config['cooldown_minutes'] = settings['cooldown_minutes']
+        
+        if settings['enabled'] and not bot.auto_reply_running:
+            bot.start_auto_reply()
+        elif not settings['enabled'] and bot.auto_reply_running:
+            bot.stop_auto_reply()
+
+def watch_autoreply_settings():
+    """
+    Leader only: follow the auto-reply settings saved by any worker
+    
+    Each worker has its own reply cache and limits, so only the leader
+    polls mentions; /save-autoreply just stores the settings.
+    """
+    applied = None
+    while not leader_stop.is_set():
         try:
-            bot = XBotEnhanced()
-            if bot.client:
-                authenticated = True
-                # Start scheduler automatically
-                if not bot.scheduler_running:
-                    bot.start_scheduler()
+            settings = bot.auto_reply_settings()
+            if settings and settings != applied:
+                apply_autoreply_settings(settings)
+                applied = settings
         except Exception as e:
-            print(f"Bot init: {e}")
-            authenticated = False
-    return bot, authenticated
+            print(f"❌ Auto-reply settings error: {e}")
+        leader_stop.wait(AUTOREPLY_SETTINGS_POLL_SECONDS)
+
+bot_initializer = BotInitializer(create_bot)
+
+def lazy_init_bot():
+    """Return (bot, authenticated); waits for the warm-up if it is still running"""
+    return bot_initializer.get()
+
+def job_media(payload):
+    """Image paths saved for a job by save_request_images"""
+    media = payload.get('media_files') or []
+    missing = [path for path in media if not os.path.exists(path)]
+    if missing:
+        raise RuntimeError(f"Uploaded image no longer available: {os.path.basename(missing[0])}")
+    return media
+
+def run_post_job(payload):
+    """Job handler: optimize the images and post the tweet"""
+    media = image_preprocessor.process_all(job_media(payload))
+    if media:
+        tweet_id = bot.post_tweet_with_media(payload['text'], media)
+    else:
+        tweet_id = bot.post_tweet(payload['text'])
+    # XBotEnhanced returns the tweet_id string directly, or None on failure
+    if not tweet_id:
+        raise RuntimeError('Failed to post tweet')
+    return {'tweet_id': tweet_id}
+
+def run_schedule_job(payload):
+    """Job handler: optimize and store the images and schedule the tweet"""
+    media = image_preprocessor.process_all(job_media(payload))
+    tweet_id = bot.schedule_tweet(
+        payload['text'],
+        datetime.fromisoformat(payload['scheduled_time']),
+        media_files=bot.store_media(media) if media else None
+    )
+    return {'id': tweet_id}
+
+def save_request_images():
+    """
+    Save up to 4 uploaded images for a job to use later
+    
+    Each upload is written once, as is, to the preprocessor cache; the job
+    optimizes it, then uploads it (post) or moves it into the blob store
+    (schedule).
+    """
+    images = request.files.getlist('images')
+    return image_preprocessor.save_uploads([(img.filename, img.stream) for img in images[:4] if img.filename])
 
 # Enhanced HTML with all features
 HTML_TEMPLATE = '''
@@ -351,7 +475,7 @@ HTML_TEMPLATE = '''
                 
                 <div class="form-group">
                     <label>Attach Images (up to 4)</label>
-                    <input type="file" id="imageInput" accept="image/*" multiple>
+                    <input type="file" id="imageInput" accept="image/*,video/mp4" multiple>
                     <div id="selectedFiles" style="margin-top: 8px; color: #8899A6; font-size: 12px;">No images selected</div>
                 </div>
                 
@@ -375,7 +499,7 @@ HTML_TEMPLATE = '''
                 
                 <div class="form-group">
                     <label>Attach Images (Optional - up to 4)</label>
-                    <input type="file" id="scheduleImageInput" accept="image/*" multiple>
+                    <input type="file" id="scheduleImageInput" accept="image/*,video/mp4" multiple>
                     <div id="scheduleSelectedFiles" style="margin-top: 8px; color: #8899A6; font-size: 12px;">No images selected</div>
                 </div>
                 
@@ -400,6 +524,8 @@ HTML_TEMPLATE = '''
             <div class="scheduled-list" id="scheduledList">
                 <p style="color: #8899A6; text-align: center;">Click refresh to load scheduled tweets</p>
             </div>
+            
+            <button class="btn-primary" id="loadMoreScheduled" style="display: none;" onclick="loadScheduledPage()">⬇️ Load More</button>
         </div>
         
         <!-- Auto-Reply Tab -->
@@ -473,7 +599,8 @@ HTML_TEMPLATE = '''
             document.getElementById(tabName).classList.add('active');
             event.target.classList.add('active');
             
-            if (tabName === 'scheduled') {
+            // Loaded once; live events keep it current afterwards
+            if (tabName === 'scheduled' && !scheduledLoaded) {
                 refreshScheduled();
             }
         }
@@ -526,6 +653,21 @@ HTML_TEMPLATE = '''
             activityLog.insertBefore(entry, activityLog.firstChild);
         }
         
+        // Poll a background job until it succeeds or fails
+        async function waitForJob(jobId) {
+            while (true) {
+                const response = await fetch(`/jobs/${jobId}`);
+                const data = await response.json();
+                if (!data.success) {
+                    return {status: 'failed', error: data.error};
+                }
+                if (data.job.status === 'succeeded' || data.job.status === 'failed') {
+                    return data.job;
+                }
+                await new Promise(resolve => setTimeout(resolve, 1000));
+            }
+        }
+        
         // Post tweet
         document.getElementById('tweetForm').addEventListener('submit', async function(e) {
             e.preventDefault();
@@ -561,9 +703,16 @@ HTML_TEMPLATE = '''
                 const data = await response.json();
                 
                 if (data.success) {
-                    log('✅ Tweet posted! ID: ' + data.tweet_id);
-                    alert('Success! Tweet posted!');
-                    clearCompose();
+                    log(`⏳ Queued as job #${data.job_id}`);
+                    const job = await waitForJob(data.job_id);
+                    if (job.status === 'succeeded') {
+                        log('✅ Tweet posted! ID: ' + job.result.tweet_id);
+                        alert('Success! Tweet posted!');
+                        clearCompose();
+                    } else {
+                        log('❌ Error: ' + job.error);
+                        alert('Error: ' + job.error);
+                    }
                 } else {
                     log('❌ Error: ' + data.error);
                     alert('Error: ' + data.error);
@@ -612,9 +761,15 @@ HTML_TEMPLATE = '''
                 const data = await response.json();
                 
                 if (data.success) {
-                    log('✅ Tweet scheduled for ' + new Date(time).toLocaleString());
-                    alert('Success! Tweet scheduled!');
-                    clearSchedule();
+                    const job = await waitForJob(data.job_id);
+                    if (job.status === 'succeeded') {
+                        log('✅ Tweet scheduled for ' + new Date(time).toLocaleString());
+                        alert('Success! Tweet scheduled!');
+                        clearSchedule();
+                    } else {
+                        log('❌ Error: ' + job.error);
+                        alert('Error: ' + job.error);
+                    }
                 } else {
                     log('❌ Error: ' + data.error);
                     alert('Error: ' + data.error);
@@ -624,33 +779,77 @@ HTML_TEMPLATE = '''
             }
         });
         
+        // Scheduled tweets list, loaded a page at a time
+        let scheduledLoaded = false;
+        let scheduledCursor = null;
+        
+        function scheduledItem(tweet) {
+            const item = document.createElement('div');
+            item.className = 'scheduled-item';
+            item.id = `scheduled-${tweet.id}`;
+            item.dataset.time = tweet.scheduled_time;
+            item.innerHTML = `
+                <div class="scheduled-time">📅 ${new Date(tweet.scheduled_time).toLocaleString()}</div>
+                <div class="scheduled-text">${tweet.text}</div>
+                <button class="btn-danger" style="font-size: 11px; padding: 6px 12px;" onclick="cancelScheduled(${tweet.id})">❌ Cancel</button>
+            `;
+            return item;
+        }
+        
+        function addScheduledItem(tweet) {
+            const list = document.getElementById('scheduledList');
+            if (document.getElementById(`scheduled-${tweet.id}`)) return;
+            if (!list.querySelector('.scheduled-item')) list.innerHTML = '';
+            // Keep the list in posting order
+            const next = Array.from(list.children).find(item => item.dataset.time > tweet.scheduled_time);
+            // Past the loaded pages: it arrives with a later page
+            if (!next && scheduledCursor) return;
+            list.insertBefore(scheduledItem(tweet), next || null);
+        }
+        
+        function removeScheduledItem(id) {
+            const item = document.getElementById(`scheduled-${id}`);
+            if (!item) return;
+            item.remove();
+            const list = document.getElementById('scheduledList');
+            if (!list.querySelector('.scheduled-item')) {
+                list.innerHTML = '<p style="color: #8899A6; text-align: center;">No scheduled tweets</p>';
+            }
+        }
+        
         // Refresh scheduled tweets
         async function refreshScheduled() {
             const list = document.getElementById('scheduledList');
             list.innerHTML = '<p style="color: #8899A6; text-align: center;">Loading...</p>';
+            scheduledCursor = null;
+            await loadScheduledPage();
+        }
+        
+        // Append the next page of scheduled tweets
+        async function loadScheduledPage() {
+            const list = document.getElementById('scheduledList');
+            const loadMore = document.getElementById('loadMoreScheduled');
+            const url = scheduledCursor ? `/get-scheduled?cursor=${encodeURIComponent(scheduledCursor)}` : '/get-scheduled';
             
             try {
-                const response = await fetch('/get-scheduled');
+                // The browser revalidates with If-None-Match; unchanged lists cost a 304
+                const response = await fetch(url);
                 const data = await response.json();
                 
+                if (!scheduledCursor) list.innerHTML = '';
                 if (data.success && data.tweets.length > 0) {
-                    list.innerHTML = '';
-                    data.tweets.forEach(tweet => {
-                        const item = document.createElement('div');
-                        item.className = 'scheduled-item';
-                        item.innerHTML = `
-                            <div class="scheduled-time">📅 ${new Date(tweet.scheduled_time).toLocaleString()}</div>
-                            <div class="scheduled-text">${tweet.text}</div>
-                            <button class="btn-danger" style="font-size: 11px; padding: 6px 12px;" onclick="cancelScheduled(${tweet.id})">❌ Cancel</button>
-                        `;
-                        list.appendChild(item);
-                    });
-                    log(`✅ Loaded ${data.tweets.length} scheduled tweet${data.tweets.length > 1 ? 's' : ''}`);
-                } else {
+                    data.tweets.forEach(tweet => list.appendChild(scheduledItem(tweet)));
+                    const count = list.querySelectorAll('.scheduled-item').length;
+                    log(`✅ Loaded ${count} scheduled tweet${count > 1 ? 's' : ''}`);
+                } else if (!list.querySelector('.scheduled-item')) {
                     list.innerHTML = '<p style="color: #8899A6; text-align: center;">No scheduled tweets</p>';
                 }
+                scheduledLoaded = data.success;
+                scheduledCursor = data.next_cursor || null;
+                loadMore.style.display = scheduledCursor ? 'block' : 'none';
             } catch (error) {
                 list.innerHTML = '<p style="color: #E0245E; text-align: center;">Error loading</p>';
+                loadMore.style.display = 'none';
             }
         }
         
@@ -668,7 +867,10 @@ HTML_TEMPLATE = '''
                 const data = await response.json();
                 if (data.success) {
                     log('✅ Scheduled tweet cancelled');
-                    refreshScheduled();
+                    removeScheduledItem(id);
+                } else {
+                    log('❌ Error: ' + data.error);
+                    alert('Error: ' + data.error);
                 }
             } catch (error) {
                 alert('Error: ' + error);
@@ -797,6 +999,51 @@ HTML_TEMPLATE = '''
             log('🗑️ Cleared schedule');
         }
         
+        // Live updates pushed by the scheduler and auto-reply engine
+        const eventHandlers = {
+            scheduled: data => {
+                if (scheduledLoaded) addScheduledItem(data);
+            },
+            posted: ({id}) => {
+                removeScheduledItem(id);
+                log(`✅ Scheduled tweet #${id} posted`);
+            },
+            failed: ({id}) => {
+                removeScheduledItem(id);
+                log(`❌ Scheduled tweet #${id} failed`);
+            },
+            cancelled: ({id}) => {
+                removeScheduledItem(id);
+            },
+            auto_reply: ({tweet_id}) => {
+                log(`💬 Auto-reply sent to tweet ${tweet_id}`);
+            },
+            // Missed events expired or the server restarted: reload the list
+            reset: () => {
+                if (scheduledLoaded) refreshScheduled();
+            }
+        };
+        let lastEventId = '';
+        
+        function connectEvents() {
+            const url = lastEventId ? `/events?lastEventId=${encodeURIComponent(lastEventId)}` : '/events';
+            const events = new EventSource(url);
+            for (const [type, handler] of Object.entries(eventHandlers)) {
+                events.addEventListener(type, e => {
+                    if (e.lastEventId) lastEventId = e.lastEventId;
+                    handler(JSON.parse(e.data));
+                });
+            }
+            // The browser retries a dropped stream by itself, but not a refused
+            // one (503 when the server has too many streams open)
+            events.onerror = () => {
+                if (events.readyState === EventSource.CLOSED) {
+                    setTimeout(connectEvents, {{ event_retry_ms }});
+                }
+            };
+        }
+        connectEvents();
+        
         // Initialize
         updateKeywordsList();
         log('✨ Enhanced GUI ready! Scheduler running in background.');
@@ -807,7 +1054,8 @@ HTML_TEMPLATE = '''
 
 @app.route('/')
 def home():
-    return render_template_string(HTML_TEMPLATE, authenticated=True)
+    return render_template_string(HTML_TEMPLATE, authenticated=True,
+                                  event_retry_ms=EVENT_STREAM_RETRY_SECONDS * 1000)
 
 @app.route('/post', methods=['POST'])
 def post_tweet():
@@ -820,35 +1068,9 @@ def post_tweet():
         return jsonify({'success': False, 'error': 'Empty tweet'})
     
     try:
-        images = request.files.getlist('images')
-        
-        if images and len(images) > 0:
-            import tempfile
-            image_paths = []
-            
-            for img in images[:4]:
-                if img.filename:
-                    temp = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(img.filename)[1])
-                    img.save(temp.name)
-                    image_paths.append(temp.name)
-                    temp.close()
-            
-            if image_paths:
-                response = bot.post_tweet_with_media(text, image_paths)
-                for path in image_paths:
-                    try:
-                        os.remove(path)
-                    except:
-                        pass
-            else:
-                response = bot.post_tweet(text)
-        else:
-            response = bot.post_tweet(text)
-        
-        # XBotEnhanced returns the tweet_id string directly, not a response object
-        if response:
-            return jsonify({'success': True, 'tweet_id': response})
-        return jsonify({'success': False, 'error': 'Failed to post tweet'})
+        # Respond right away; a job worker uploads the media and posts
+        job_id = job_queue.enqueue('post', {'text': text, 'media_files': save_request_images()})
+        return jsonify({'success': True, 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -865,37 +1087,73 @@ def schedule_tweet():
         return jsonify({'success': False, 'error': 'Missing data'})
     
     try:
-        scheduled_dt = datetime.fromisoformat(scheduled_time)
-        
-        # Check for uploaded images
-        images = request.files.getlist('images')
-        
-        if images and len(images) > 0:
-            # Save images to permanent location for scheduled tweet
-            import tempfile
-            image_dir = os.path.join(os.path.dirname(__file__), 'scheduled_images')
-            os.makedirs(image_dir, exist_ok=True)
-            
-            image_paths = []
-            for img in images[:4]:
-                if img.filename:
-                    # Use timestamp in filename to make it unique
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"{timestamp}_{img.filename}"
-                    filepath = os.path.join(image_dir, filename)
-                    img.save(filepath)
-                    image_paths.append(filepath)
-            
-            # Schedule with media files
-            tweet_id = bot.schedule_tweet(text, scheduled_dt, media_files=image_paths if image_paths else None)
-        else:
-            # Schedule text only
-            tweet_id = bot.schedule_tweet(text, scheduled_dt)
-        
-        return jsonify({'success': True, 'id': tweet_id})
+        # Validate now so bad input is reported by this request, not the job
+        datetime.fromisoformat(scheduled_time)
+        
+        job_id = job_queue.enqueue('schedule', {
+            'text': text,
+            'scheduled_time': scheduled_time,
+            'media_files': save_request_images()
+        })
+        return jsonify({'success': True, 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    bot, auth = lazy_init_bot()
+    if not auth or not job_queue:
+        return jsonify({'success': False, 'error': 'Not authenticated'})
+    
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/events')
+def events():
+    """Server-Sent Events stream of scheduler and auto-reply updates"""
+    bot, auth = lazy_init_bot()
+    if not auth or not bot:
+        return jsonify({'success': False, 'error': 'Not authenticated'})
+    
+    if not event_stream_slots.acquire(blocking=False):
+        # Too many open streams: the page reconnects after Retry-After
+        return Response(f'retry: {EVENT_STREAM_RETRY_SECONDS * 1000}\n\n', status=503,
+                        mimetype='text/event-stream', headers={
+                            'Retry-After': str(EVENT_STREAM_RETRY_SECONDS),
+                            'Cache-Control': 'no-cache'
+                        })
+    
+    # Sent by the browser when it reconnects, so missed events are replayed;
+    # the page passes it as a parameter when it reconnects by itself
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    subscription = bot.events.subscribe(last_event_id)
+    
+    def stream():
+        yield 'retry: 3000\n\n'
+        while True:
+            event = subscription.get(timeout=15)
+            if event is not None:
+                yield event.to_sse()
+            elif subscription.closed:
+                break
+            else:
+                # Keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+    
+    def end_stream():
+        bot.events.unsubscribe(subscription)
+        event_stream_slots.release()
+    
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(end_stream)
+    return response
+
 @app.route('/get-scheduled')
 def get_scheduled():
     bot, auth = lazy_init_bot()
@@ -903,17 +1161,41 @@ def get_scheduled():
         return jsonify({'success': False, 'error': 'Not authenticated'})
     
     try:
-        tweets = bot.get_scheduled_tweets()
-        # Convert tuple format to dict format for frontend
-        tweet_list = []
-        for tweet in tweets:
-            tweet_id, content, scheduled_time, media_files, reply_to_tweet_id = tweet
-            tweet_list.append({
-                'id': tweet_id,
-                'text': content,
-                'scheduled_time': scheduled_time
-            })
-        return jsonify({'success': True, 'tweets': tweet_list})
+        # Query parameters: status, since, until (ISO times), cursor, limit
+        status = request.args.get('status', 'pending')
+        since = request.args.get('since')
+        until = request.args.get('until')
+        since = datetime.fromisoformat(since) if since else None
+        until = datetime.fromisoformat(until) if until else None
+        cursor = request.args.get('cursor')
+        limit = min(max(request.args.get('limit', SCHEDULED_PAGE_SIZE, type=int), 1), MAX_SCHEDULED_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        # Read the version before the rows: if they change in between, the
+        # client holds an older ETag and simply gets fresh data next time
+        etag = f'scheduled-{bot.scheduled_tweets_version()}'
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            tweets, next_cursor = bot.get_scheduled_page(status, since, until, cursor, limit)
+            # Convert tuple format to dict format for frontend
+            tweet_list = []
+            for tweet in tweets:
+                tweet_id, content, scheduled_time, media_files, reply_to_tweet_id = tweet
+                tweet_list.append({
+                    'id': tweet_id,
+                    'text': content,
+                    'scheduled_time': scheduled_time
+                })
+            response = jsonify({'success': True, 'tweets': tweet_list, 'next_cursor': next_cursor})
+        response.set_etag(etag)
+        # Cache, but revalidate every time (cheap: a 304 without a query)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -927,7 +1209,8 @@ def cancel_scheduled():
     tweet_id = data.get('id')
     
     try:
-        bot.cancel_scheduled_tweet(tweet_id)
+        if not bot.cancel_scheduled_tweet(tweet_id):
+            return jsonify({'success': False, 'error': 'Tweet is already being posted or is no longer scheduled'})
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -946,15 +1229,11 @@ def save_autoreply():
     cooldown = data.get('cooldown', 30)
     
     try:
-        bot.auto_reply_config['enabled'] = enabled
-        bot.auto_reply_config['keywords'] = {kw: message for kw in keywords}
-        bot.auto_reply_config['max_replies_per_hour'] = max_replies
-        bot.auto_reply_config['cooldown_minutes'] = cooldown
-        
-        if enabled and not bot.auto_reply_running:
-            bot.start_auto_reply()
-        elif not enabled and bot.auto_reply_running:
-            bot.stop_auto_reply()
+        bot.set_keyword_replies(keywords, message)
+        # The scheduler's worker runs auto-reply and picks the settings up
+        bot.save_auto_reply_settings(enabled, max_replies, cooldown)
+        if scheduler_lock is not None and scheduler_lock.held:
+            apply_autoreply_settings(bot.auto_reply_settings())
         
         return jsonify({'success': True})
     except Exception as e:
@@ -967,12 +1246,38 @@ def stop_autoreply():
         return jsonify({'success': False, 'error': 'Not authenticated'})
     
     try:
-        bot.stop_auto_reply()
-        bot.auto_reply_config['enabled'] = False
+        config = bot.auto_reply_settings() or bot.auto_reply_config
+        bot.save_auto_reply_settings(False, config['max_replies_per_hour'], config['cooldown_minutes'])
+        if scheduler_lock is not None and scheduler_lock.held:
+            apply_autoreply_settings(bot.auto_reply_settings())
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def stop_bot_workers(timeout: float = 30):
+    """Stop the job workers, auto-reply and scheduler and give up leadership"""
+    if job_queue is not None:
+        job_queue.stop(timeout)
+    if bot.auto_reply_running:
+        bot.stop_auto_reply()
+    if bot.scheduler_running:
+        bot.stop_scheduler(timeout)
+    if scheduler_lock is not None:
+        scheduler_lock.release()
+
+def shutdown(timeout: float = 30):
+    """Stop background work and release resources before the process exits"""
+    if bot is None:
+        return
+    print("⏳ Shutting down...")
+    # End open event streams so their request threads can exit
+    bot.events.close()
+    leader_stop.set()
+    stop_bot_workers(timeout)
+    shutdown_preprocess_executor()
+    close_shared_transport()
+    bot.db.close()
+
 def open_browser():
     """Open browser after delay"""
     import time
@@ -994,5 +1299,11 @@ if __name__ == '__main__':
     print("💡 Features: Post · Schedule · Auto-Reply · Images")
     print("\n🎯 Press Ctrl+C to stop\n")
     
-    app.run(host='0.0.0.0', debug=False, port=port)
+    # Authenticate while the server starts, not on the first request
+    bot_initializer.warm_up()
+    
+    try:
+        app.run(host='0.0.0.0', debug=False, port=port)
+    finally:
+        shutdown()
 